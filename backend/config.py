@@ -1,7 +1,7 @@
 """
 Accident Incident Responder - Backend Configuration
 """
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
 
 
@@ -42,8 +42,7 @@ class Settings(BaseSettings):
     TWILIO_AUTH_TOKEN: str = ""
     TWILIO_PHONE_NUMBER: str = ""
     
-    class Config:
-        env_file = ".env"
+    model_config = SettingsConfigDict(env_file=".env", frozen=True, extra="ignore")
 
 
 @lru_cache()
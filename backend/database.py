@@ -1,20 +1,51 @@
 """
 Database connection and session management
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import get_settings
 
 settings = get_settings()
 
+# Shared QueuePool tuning: keep warm connections around, drop dead ones
+# before use, and recycle before server-side idle timeouts kick in
+POOL_OPTIONS = dict(
+    pool_size=20,
+    max_overflow=10,
+    pool_timeout=30,
+    pool_pre_ping=True,
+    pool_recycle=3600,
+    pool_use_lifo=True
+)
+
 engine = create_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
+    **POOL_OPTIONS
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _async_database_url(url: str) -> str:
+    """Map a sync database URL to its async driver equivalent"""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+
+# Async engine for hot endpoints so DB waits don't block the event loop
+async_engine = create_async_engine(
+    _async_database_url(settings.DATABASE_URL),
+    **POOL_OPTIONS
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
@@ -27,7 +58,25 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Dependency for getting an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def ping_db() -> bool:
+    """Run SELECT 1 on a pooled connection"""
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    return True
+
+
 def init_db():
     """Initialize database tables"""
-    from models import Incident, Camera, PoliceStation, AmbulanceProvider, DispatchLog
+    from models import Incident, Camera, PoliceStation, AmbulanceProvider, DispatchLog, NotificationOutbox
+    from models import upgrade_compressed_json_columns, upgrade_incident_id_default
+    from services.geo import init_station_rtree
+    upgrade_compressed_json_columns(engine)
+    upgrade_incident_id_default(engine)
     Base.metadata.create_all(bind=engine)
+    init_station_rtree(engine)
@@ -4,15 +4,25 @@ FastAPI Backend with WebSocket support
 """
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import os
-import json
-from typing import List
+import struct
+import time
+import numpy as np
+import orjson
+from typing import Dict, Set, Optional
 
 from config import get_settings
-from database import init_db
+from database import init_db, ping_db
+from services import geo
+from services.video_jobs import video_jobs
+from services.video_processor import shutdown_executor
+from services.notification import close_smtp_pools, close_http_client
+from services.notification_worker import notification_worker
 from routers import incidents, cameras, dispatch
 
 settings = get_settings()
@@ -24,28 +34,196 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC
+
+
+def encode_binary_frame(message: dict) -> bytes:
+    """
+    Pack a message carrying a binary_payload into a single binary frame:
+    [4-byte little-endian header length][JSON header][raw payload bytes]
+    """
+    header = {k: v for k, v in message.items() if k != "binary_payload"}
+    payload = message["binary_payload"]
+    if isinstance(payload, np.ndarray):
+        payload = np.ascontiguousarray(payload)
+        header["shape"] = payload.shape
+        header["dtype"] = str(payload.dtype)
+        payload = payload.tobytes()
+    header_bytes = orjson.dumps(header, option=ORJSON_OPTIONS)
+    return struct.pack("<I", len(header_bytes)) + header_bytes + bytes(payload)
+
+
+# Per-client outbound buffer; clients that fall this far behind are evicted
+SEND_QUEUE_SIZE = 256
+
+# Heartbeat: ping clients periodically and drop ones that have gone silent
+HEARTBEAT_INTERVAL = 20  # seconds
+REAP_INTERVAL = 60  # seconds
+STALE_AFTER = 90  # seconds without any message from the client
+
 
 # WebSocket connection manager
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Set[WebSocket] = set()
+        self._send_queues: Dict[WebSocket, asyncio.Queue] = {}
+        self._writer_tasks: Dict[WebSocket, asyncio.Task] = {}
+        self._last_seen: Dict[WebSocket, float] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._broadcaster_task: Optional[asyncio.Task] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
     
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
+        queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self._send_queues[websocket] = queue
+        self._writer_tasks[websocket] = asyncio.create_task(self._writer(websocket, queue))
+        self.touch(websocket)
         logger.info(f"WebSocket connected. Total connections: {len(self.active_connections)}")
     
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        self.active_connections.discard(websocket)
+        self._send_queues.pop(websocket, None)
+        self._last_seen.pop(websocket, None)
+        task = self._writer_tasks.pop(websocket, None)
+        if task and task is not asyncio.current_task():
+            task.cancel()
         logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
     
+    def touch(self, websocket: WebSocket):
+        """Record that a client is alive (any inbound message counts)"""
+        self._last_seen[websocket] = time.monotonic()
+    
+    def start(self):
+        """Start the background broadcaster and heartbeat (called from lifespan startup)"""
+        self._queue = asyncio.Queue()
+        self._broadcaster_task = asyncio.create_task(self._broadcaster())
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+    
+    async def stop(self):
+        """Stop the broadcaster and client writers (called from lifespan shutdown)"""
+        tasks = list(self._writer_tasks.values())
+        tasks += [t for t in (self._broadcaster_task, self._heartbeat_task) if t]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        
+        self._writer_tasks.clear()
+        self._send_queues.clear()
+        self._last_seen.clear()
+        self._broadcaster_task = None
+        self._heartbeat_task = None
+        self._queue = None
+    
     async def broadcast(self, message: dict):
-        """Broadcast message to all connected clients"""
-        for connection in self.active_connections:
+        """Queue message for delivery to all connected clients"""
+        if self._queue is None or "binary_payload" in message:
+            # Broadcaster not running, or binary frame that can't be batched - send immediately
+            await self._send_to_all(message)
+            return
+        self._queue.put_nowait(message)
+    
+    async def _broadcaster(self):
+        """
+        Drain the queue and coalesce pending messages into a single frame.
+        Blocks on the first message, then takes whatever else is already queued.
+        """
+        while True:
+            batch = [await self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            
+            try:
+                await self._send_to_all({"type": "batch", "events": batch})
+            except Exception as e:
+                logger.error(f"Broadcast failed: {e}")
+    
+    async def _heartbeat(self):
+        """Ping all clients and periodically close ones that stopped responding"""
+        last_reap = time.monotonic()
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
             try:
-                await connection.send_json(message)
+                await self._send_to_all({"type": "ping"})
+                
+                now = time.monotonic()
+                if now - last_reap >= REAP_INTERVAL:
+                    last_reap = now
+                    await self._reap_stale(now)
             except Exception as e:
-                logger.error(f"Failed to send message: {e}")
+                logger.error(f"Heartbeat failed: {e}")
+    
+    async def _reap_stale(self, now: float):
+        """Close connections that haven't sent anything for STALE_AFTER seconds"""
+        stale = [ws for ws, seen in tuple(self._last_seen.items()) if now - seen > STALE_AFTER]
+        for websocket in stale:
+            logger.warning("Closing stale WebSocket client (no pong)")
+            self.disconnect(websocket)
+            try:
+                await websocket.close(code=1001)  # Going away
+            except Exception:
+                pass
+    
+    async def _writer(self, websocket: WebSocket, queue: asyncio.Queue):
+        """Deliver queued frames to a single client"""
+        try:
+            while True:
+                frame = await queue.get()
+                if isinstance(frame, bytes):
+                    await websocket.send_bytes(frame)
+                else:
+                    await websocket.send_text(frame)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to send message: {e}")
+            self.disconnect(websocket)
+    
+    @staticmethod
+    def _encode(message: dict):
+        if "binary_payload" in message:
+            return encode_binary_frame(message)
+        # Sent as a text frame so browsers can JSON.parse it
+        return orjson.dumps(message, option=ORJSON_OPTIONS).decode()
+    
+    async def send_to(self, websocket: WebSocket, message: dict):
+        """
+        Enqueue a message for one client. Replies go through the client's
+        writer like broadcasts, so only one coroutine ever sends on the socket.
+        """
+        queue = self._send_queues.get(websocket)
+        if queue is None:
+            return
+        try:
+            queue.put_nowait(self._encode(message))
+        except asyncio.QueueFull:
+            await self._evict([websocket])
+    
+    async def _send_to_all(self, message: dict):
+        """Serialize once and enqueue for every client, evicting clients that can't keep up"""
+        frame = self._encode(message)
+        
+        to_evict = []
+        for websocket, queue in tuple(self._send_queues.items()):
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                to_evict.append(websocket)
+        
+        await self._evict(to_evict)
+    
+    async def _evict(self, websockets):
+        for websocket in websockets:
+            logger.warning("Evicting slow WebSocket client (send queue full)")
+            self.disconnect(websocket)
+            try:
+                await websocket.close(code=1013)  # Try again later
+            except Exception:
+                pass
 
 
 manager = ConnectionManager()
@@ -65,10 +243,24 @@ async def lifespan(app: FastAPI):
     
     logger.info("Database initialized. Directories created.")
     
+    # Build the OpenAPI document now; FastAPI caches it for /openapi.json
+    app.openapi()
+    geo.warmup()
+    
+    manager.start()
+    video_jobs.start(on_complete=broadcast_video_processed)
+    notification_worker.start()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down Accident Incident Responder...")
+    await video_jobs.stop()
+    await notification_worker.stop()
+    shutdown_executor()
+    await manager.stop()
+    await close_smtp_pools()
+    await close_http_client()
 
 
 # Create FastAPI app
@@ -76,6 +268,7 @@ app = FastAPI(
     title=settings.APP_NAME,
     description="ML-based Accident Incident Responder with Police & Ambulance Integration",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -116,9 +309,15 @@ def root():
 
 
 @app.get("/health")
-def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy"}
+@app.get("/healthz")
+async def health_check():
+    """Health check endpoint (also keeps a pooled DB connection warm)"""
+    try:
+        await ping_db()
+    except Exception as e:
+        logger.error(f"Database health check failed: {e}")
+        return ORJSONResponse({"status": "unhealthy", "database": "unreachable"}, status_code=503)
+    return {"status": "healthy", "database": "ok"}
 
 
 @app.websocket("/ws")
@@ -135,27 +334,48 @@ async def websocket_endpoint(websocket: WebSocket):
         while True:
             # Keep connection alive and handle incoming messages
             data = await websocket.receive_text()
-            message = json.loads(data)
+            manager.touch(websocket)
+            message = orjson.loads(data)
             
-            # Handle ping/pong
+            # Handle ping/pong (client pongs only need the touch above)
             if message.get("type") == "ping":
-                await websocket.send_json({"type": "pong"})
+                await manager.send_to(websocket, {"type": "pong"})
             
             # Handle subscription to specific incident
             elif message.get("type") == "subscribe":
                 incident_id = message.get("incident_id")
-                await websocket.send_json({
+                await manager.send_to(websocket, {
                     "type": "subscribed",
                     "incident_id": incident_id
                 })
                 
     except WebSocketDisconnect:
+        pass
+    except orjson.JSONDecodeError:
+        logger.warning("Closing WebSocket client that sent invalid JSON")
+        await websocket.close(code=1007)  # Invalid frame payload data
+    finally:
         manager.disconnect(websocket)
 
 
 # Function to broadcast new incidents (called from incident creation)
 async def broadcast_new_incident(incident_data: dict):
     """Broadcast new incident to all connected dashboards"""
+    bounding_boxes = incident_data.get("bounding_boxes")
+    if bounding_boxes:
+        # Ship bbox coordinates as raw float32 instead of nested JSON lists
+        data = {k: v for k, v in incident_data.items() if k != "bounding_boxes"}
+        data["box_labels"] = [
+            {"class": b.get("class"), "confidence": b.get("confidence")}
+            for b in bounding_boxes
+        ]
+        await manager.broadcast({
+            "type": "new_incident",
+            "data": data,
+            "binary_payload": np.asarray([b["bbox"] for b in bounding_boxes], dtype=np.float32)
+        })
+        return
+    
     await manager.broadcast({
         "type": "new_incident",
         "data": incident_data
@@ -171,6 +391,14 @@ async def broadcast_status_update(incident_id: str, status: str):
     })
 
 
+async def broadcast_video_processed(job: dict):
+    """Push a finished video job result to dashboards"""
+    await manager.broadcast({
+        "type": "video_processed",
+        "data": job
+    })
+
+
 async def broadcast_alert(severity: str, message: str):
     """Broadcast critical alert"""
     await manager.broadcast({
@@ -0,0 +1,65 @@
+"""Add the query indexes and make timestamps timezone-aware
+
+Revision ID: 0001_query_indexes
+Revises:
+Create Date: 2026-10-15
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_query_indexes"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (name, table, columns) - mirrors the Index entries in models.py
+INDEXES = [
+    ("ix_cameras_zone", "cameras", ["zone"]),
+    ("ix_cameras_active_zone", "cameras", ["is_active", "zone"]),
+    ("ix_incident_status_camera", "incidents", ["status", "camera_id"]),
+    ("ix_incidents_status_created", "incidents", ["status", sa.text("created_at DESC")]),
+    ("ix_incidents_created_at", "incidents", [sa.text("created_at DESC")]),
+    ("ix_police_active", "police_stations", ["is_active"]),
+    ("ix_ambulance_active", "ambulance_providers", ["is_active"]),
+    ("ix_dispatch_incident", "dispatch_logs", ["incident_id"]),
+]
+
+TIMESTAMP_COLUMNS = {
+    "cameras": ["created_at"],
+    "incidents": ["timestamp", "verified_at", "created_at", "updated_at"],
+    "police_stations": ["created_at"],
+    "ambulance_providers": ["created_at"],
+    "dispatch_logs": ["requested_at", "dispatched_at", "arrived_at", "closed_at"],
+}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    
+    for name, table, columns in INDEXES:
+        if inspector.has_table(table):
+            op.create_index(name, table, columns, if_not_exists=True)
+    
+    # SQLite has no timestamptz; PostgreSQL tables created before the switch
+    # still hold "timestamp without time zone", read as session-local time
+    if bind.dialect.name != "postgresql":
+        return
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        if not inspector.has_table(table):
+            continue
+        existing = {c["name"]: c["type"] for c in inspector.get_columns(table)}
+        for column in columns:
+            column_type = existing.get(column)
+            if isinstance(column_type, sa.DateTime) and not column_type.timezone:
+                op.alter_column(
+                    table, column,
+                    type_=sa.DateTime(timezone=True),
+                    existing_type=column_type,
+                )
+
+
+def downgrade() -> None:
+    # Timestamps stay timezone-aware; converting back would drop the offset
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -1,11 +1,163 @@
 """
 Database Models for Accident Incident Responder
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Enum, Boolean, JSON
+import logging
+
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Enum, Boolean, Index, LargeBinary, inspect
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import func, text
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import TypeDecorator
 from database import Base
 import enum
+import orjson
+import zstandard
+
+logger = logging.getLogger(__name__)
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class CompressedJSON(TypeDecorator):
+    """JSON value stored as zstd-compressed orjson bytes"""
+    impl = LargeBinary
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return zstandard.ZstdCompressor(level=3).compress(
+            orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC)
+        )
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            # Row written before compression was introduced
+            return orjson.loads(value)
+        value = bytes(value)
+        if value.startswith(ZSTD_MAGIC):
+            value = zstandard.ZstdDecompressor().decompress(value)
+        return orjson.loads(value)
+
+
+# (table, column) pairs stored as CompressedJSON; databases created before it
+# have json/jsonb columns there
+COMPRESSED_JSON_COLUMNS = (
+    ("incidents", "snapshots"),
+    ("incidents", "bounding_boxes"),
+    ("dispatch_logs", "request_payload"),
+    ("dispatch_logs", "response_payload"),
+)
+
+
+def upgrade_compressed_json_columns(engine) -> None:
+    """
+    Convert pre-existing JSON columns to bytea on PostgreSQL, which (unlike
+    SQLite) rejects CompressedJSON's bytes binds on a json column. Existing
+    values become their UTF-8 JSON text, which CompressedJSON still reads.
+    Equivalent manual step, per column:
+        ALTER TABLE incidents ALTER COLUMN snapshots TYPE bytea
+            USING convert_to(snapshots::text, 'UTF8');
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table, column in COMPRESSED_JSON_COLUMNS:
+            if table not in tables:
+                continue
+            col_type = next(c["type"] for c in inspector.get_columns(table) if c["name"] == column)
+            if isinstance(col_type, LargeBinary):
+                continue
+            logger.info(f"Converting {table}.{column} to bytea for CompressedJSON")
+            conn.execute(text(
+                f"ALTER TABLE {table} ALTER COLUMN {column} TYPE bytea "
+                f"USING convert_to({column}::text, 'UTF8')"
+            ))
+
+
+def upgrade_incident_id_default(engine) -> None:
+    """
+    Give an existing incidents.incident_id column its server default;
+    create_all leaves existing tables untouched, and callers no longer set it.
+    PostgreSQL: ALTER COLUMN ... SET DEFAULT (pgcrypto is enabled below 13,
+    where gen_random_uuid() is not built in). SQLite can't alter a column
+    default, so the table is rebuilt with the current definition and its rows.
+    """
+    dialect = engine.dialect.name
+    if dialect not in ("postgresql", "sqlite"):
+        return
+    
+    table = Incident.__table__
+    with engine.begin() as conn:
+        if dialect == "postgresql" and conn.dialect.server_version_info < (13,):
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pgcrypto"))
+        
+        inspector = inspect(conn)
+        if not inspector.has_table(table.name):
+            return
+        columns = {c["name"]: c for c in inspector.get_columns(table.name)}
+        if columns.get("incident_id", {}).get("default") is not None:
+            return
+        
+        logger.info("Adding the server default to incidents.incident_id")
+        default_sql = incident_id_default().compile(dialect=engine.dialect)
+        if dialect == "postgresql":
+            conn.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN incident_id SET DEFAULT {default_sql}"))
+            return
+        
+        # SQLite's documented table rebuild: new table, copy rows, drop, rename
+        create_sql = str(CreateTable(table).compile(dialect=engine.dialect)).replace(
+            f"CREATE TABLE {table.name} ", f"CREATE TABLE {table.name}_new ", 1
+        )
+        names = ", ".join(c.name for c in table.columns if c.name in columns)
+        conn.exec_driver_sql(create_sql)
+        conn.exec_driver_sql(f"INSERT INTO {table.name}_new ({names}) SELECT {names} FROM {table.name}")
+        conn.exec_driver_sql(f"DROP TABLE {table.name}")
+        conn.exec_driver_sql(f"ALTER TABLE {table.name}_new RENAME TO {table.name}")
+        for index in table.indexes:
+            index.create(conn)
+
+
+class incident_id_default(FunctionElement):
+    """Server-side INC-YYYY-XXXXXXXXXXXX id (48 random bits)"""
+    type = String(50)
+    inherit_cache = True
+
+
+@compiles(incident_id_default)
+def _incident_id_default_pg(element, compiler, **kw):
+    return (
+        "('INC-' || extract(year from now())::text || '-' || "
+        "upper(substr(replace(gen_random_uuid()::text, '-', ''), 1, 12)))"
+    )
+
+
+@compiles(incident_id_default, "sqlite")
+def _incident_id_default_sqlite(element, compiler, **kw):
+    return "('INC-' || strftime('%Y', 'now') || '-' || hex(randomblob(6)))"
+
+
+class start_of_today(FunctionElement):
+    """Midnight of the database's current day"""
+    type = DateTime(timezone=True)
+    inherit_cache = True
+
+
+@compiles(start_of_today)
+def _start_of_today_pg(element, compiler, **kw):
+    return "date_trunc('day', now())"
+
+
+@compiles(start_of_today, "sqlite")
+def _start_of_today_sqlite(element, compiler, **kw):
+    return "datetime('now', 'start of day')"
 
 
 class SeverityLevel(str, enum.Enum):
@@ -40,6 +192,12 @@ class DispatchStatus(str, enum.Enum):
     CLOSED = "CLOSED"
 
 
+class OutboxStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    SENT = "SENT"
+    FAILED = "FAILED"
+
+
 class Camera(Base):
     __tablename__ = "cameras"
     
@@ -49,19 +207,23 @@ class Camera(Base):
     location_address = Column(String(255))
     latitude = Column(Float)
     longitude = Column(Float)
-    zone = Column(String(100))
+    zone = Column(String(100), index=True)
     rtsp_url = Column(String(500), nullable=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     incidents = relationship("Incident", back_populates="camera")
+    
+    __table_args__ = (
+        Index("ix_cameras_active_zone", "is_active", "zone"),
+    )
 
 
 class Incident(Base):
     __tablename__ = "incidents"
     
     id = Column(Integer, primary_key=True, index=True)
-    incident_id = Column(String(50), unique=True, index=True)
+    incident_id = Column(String(50), unique=True, index=True, server_default=incident_id_default())
     camera_id = Column(Integer, ForeignKey("cameras.id"))
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     
@@ -76,8 +238,8 @@ class Incident(Base):
     
     # Media
     video_clip_path = Column(String(500), nullable=True)
-    snapshots = Column(JSON, default=list)  # List of snapshot paths
-    bounding_boxes = Column(JSON, default=list)  # Detection bounding boxes
+    snapshots = Column(CompressedJSON, default=list)  # List of snapshot paths
+    bounding_boxes = Column(CompressedJSON, default=list)  # Detection bounding boxes
     
     # Metadata
     verified_by = Column(String(100), nullable=True)
@@ -87,6 +249,13 @@ class Incident(Base):
     
     camera = relationship("Camera", back_populates="incidents")
     dispatch_logs = relationship("DispatchLog", back_populates="incident")
+    
+    __table_args__ = (
+        Index("ix_incident_status_camera", "status", "camera_id"),
+        # Serve status filters + newest-first ordering straight from the index
+        Index("ix_incidents_status_created", "status", text("created_at DESC")),
+        Index("ix_incidents_created_at", text("created_at DESC")),
+    )
 
 
 class PoliceStation(Base):
@@ -106,6 +275,10 @@ class PoliceStation(Base):
     
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_police_active", "is_active"),
+    )
 
 
 class AmbulanceProvider(Base):
@@ -122,6 +295,10 @@ class AmbulanceProvider(Base):
     
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_ambulance_active", "is_active"),
+    )
 
 
 class DispatchLog(Base):
@@ -134,8 +311,8 @@ class DispatchLog(Base):
     provider_id = Column(String(50))
     status = Column(Enum(DispatchStatus), default=DispatchStatus.REQUESTED)
     
-    request_payload = Column(JSON, nullable=True)
-    response_payload = Column(JSON, nullable=True)
+    request_payload = Column(CompressedJSON, nullable=True)
+    response_payload = Column(CompressedJSON, nullable=True)
     
     requested_by = Column(String(100))
     requested_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -146,3 +323,27 @@ class DispatchLog(Base):
     notes = Column(Text, nullable=True)
     
     incident = relationship("Incident", back_populates="dispatch_logs")
+    
+    __table_args__ = (
+        Index("ix_dispatch_incident", "incident_id"),
+    )
+
+
+class NotificationOutbox(Base):
+    """Notifications waiting for (or retrying) delivery by the outbox worker"""
+    __tablename__ = "notifications_outbox"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50))  # e.g. "police_report"
+    payload = Column(CompressedJSON)
+    status = Column(Enum(OutboxStatus), default=OutboxStatus.PENDING)
+    attempts = Column(Integer, default=0)
+    next_retry_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_error = Column(Text, nullable=True)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+    
+    __table_args__ = (
+        Index("ix_outbox_status_retry", "status", "next_retry_at"),
+    )
@@ -4,6 +4,7 @@ Camera Management Router
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
+import time
 
 from database import get_db
 from models import Camera
@@ -11,6 +12,14 @@ from schemas import CameraCreate, CameraResponse
 
 router = APIRouter(prefix="/cameras", tags=["Cameras"])
 
+# Zones change rarely; serve them from memory for a short while
+ZONES_CACHE_TTL = 60  # seconds
+_zones_cache = {"ts": 0.0, "value": None}
+
+
+def invalidate_zones_cache():
+    _zones_cache["ts"] = 0.0
+
 
 @router.get("/", response_model=List[CameraResponse])
 def get_cameras(
@@ -32,8 +41,15 @@ def get_cameras(
 @router.get("/zones")
 def get_zones(db: Session = Depends(get_db)):
     """Get list of all zones"""
+    if _zones_cache["value"] is not None and time.monotonic() - _zones_cache["ts"] < ZONES_CACHE_TTL:
+        return _zones_cache["value"]
+    
     zones = db.query(Camera.zone).distinct().all()
-    return [z[0] for z in zones if z[0]]
+    value = [z[0] for z in zones if z[0]]
+    
+    _zones_cache["value"] = value
+    _zones_cache["ts"] = time.monotonic()
+    return value
 
 
 @router.get("/{camera_id}", response_model=CameraResponse)
@@ -57,6 +73,7 @@ def create_camera(camera: CameraCreate, db: Session = Depends(get_db)):
     db.add(db_camera)
     db.commit()
     db.refresh(db_camera)
+    invalidate_zones_cache()
     
     return db_camera
 
@@ -89,6 +106,7 @@ def update_camera(
     
     db.commit()
     db.refresh(camera)
+    invalidate_zones_cache()
     
     return camera
 
@@ -102,5 +120,6 @@ def delete_camera(camera_id: int, db: Session = Depends(get_db)):
     
     camera.is_active = False
     db.commit()
+    invalidate_zones_cache()
     
     return {"message": "Camera deactivated successfully"}
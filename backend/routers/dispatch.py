@@ -2,12 +2,16 @@
 Dispatch Router - Police Reporting and Ambulance Dispatch
 """
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select, insert, update
+from sqlalchemy.sql import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
-from datetime import datetime
 import math
+import numpy as np
 
-from database import get_db
+from database import get_db, get_async_db
 from models import (
     Incident, PoliceStation, AmbulanceProvider, DispatchLog, 
     IncidentStatus, DispatchStatus, Camera
@@ -20,23 +24,60 @@ from schemas import (
 )
 from services.report_generator import generate_incident_report
 from services.notification import send_police_report, dispatch_ambulance
+from services.notification_worker import notification_worker
+from services.geo import rtree_available, nearby_station_ids, nearest_index
 
 router = APIRouter(prefix="/dispatch", tags=["Dispatch"])
 
 
-def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calculate distance between two points (Haversine formula)"""
-    R = 6371  # Earth's radius in km
-    
-    lat1_rad = math.radians(lat1)
-    lat2_rad = math.radians(lat2)
-    delta_lat = math.radians(lat2 - lat1)
-    delta_lon = math.radians(lon2 - lon1)
-    
-    a = math.sin(delta_lat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    
-    return R * c
+# Active police station coordinates as (ids, lat_rad, lon_rad, cos_lat) arrays.
+# Reset to None whenever stations are created or changed.
+_station_arrays = None
+
+
+def invalidate_station_cache():
+    """Drop cached station coordinates so the next lookup reloads them"""
+    global _station_arrays
+    _station_arrays = None
+
+
+def _coordinate_arrays(rows):
+    """
+    Build (ids, lat_rad, lon_rad, cos_lat) arrays from (id, latitude, longitude) rows.
+    Station coordinates are static, so the per-station cosine is computed here once.
+    """
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    lat_rad = np.radians(np.array([r[1] for r in rows], dtype=np.float64))
+    lon_rad = np.radians(np.array([r[2] for r in rows], dtype=np.float64))
+    return ids, lat_rad, lon_rad, np.cos(lat_rad)
+
+
+def get_station_arrays(db: Session):
+    """Get cached coordinate arrays of active police stations"""
+    global _station_arrays
+    if _station_arrays is None:
+        rows = db.query(
+            PoliceStation.id, PoliceStation.latitude, PoliceStation.longitude
+        ).filter(PoliceStation.is_active == True).all()
+        _station_arrays = _coordinate_arrays(rows)
+    return _station_arrays
+
+
+def get_candidate_station_arrays(db: Session, latitude: float, longitude: float):
+    """
+    Coordinate arrays for stations that may be nearest to a point.
+    Uses the SQLite R-Tree to prune candidates when available.
+    """
+    if not rtree_available():
+        return get_station_arrays(db)
+    
+    candidate_ids = nearby_station_ids(db, latitude, longitude)
+    if not candidate_ids:
+        return _coordinate_arrays([])
+    rows = db.query(
+        PoliceStation.id, PoliceStation.latitude, PoliceStation.longitude
+    ).filter(PoliceStation.id.in_(candidate_ids)).all()
+    return _coordinate_arrays(rows)
 
 
 # ============ Police Stations ============
@@ -63,29 +104,34 @@ def create_police_station(
     db.add(db_station)
     db.commit()
     db.refresh(db_station)
+    invalidate_station_cache()
     return db_station
 
 
 @router.get("/police-stations/nearest/{incident_id}", response_model=PoliceStationResponse)
-def get_nearest_police_station(incident_id: int, db: Session = Depends(get_db)):
+async def get_nearest_police_station(incident_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get nearest police station for an incident"""
-    incident = db.query(Incident).filter(Incident.id == incident_id).first()
+    result = await db.execute(
+        select(Incident).options(joinedload(Incident.camera)).where(Incident.id == incident_id)
+    )
+    incident = result.scalar_one_or_none()
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
     
-    camera = db.query(Camera).filter(Camera.id == incident.camera_id).first()
+    camera = incident.camera
     if not camera:
         raise HTTPException(status_code=404, detail="Camera not found")
     
-    stations = db.query(PoliceStation).filter(PoliceStation.is_active == True).all()
-    if not stations:
+    ids, lat_rad, lon_rad, cos_lat = await db.run_sync(
+        get_candidate_station_arrays, camera.latitude, camera.longitude
+    )
+    if not len(ids):
         raise HTTPException(status_code=404, detail="No police stations found")
     
-    nearest = min(stations, key=lambda s: calculate_distance(
-        camera.latitude, camera.longitude, s.latitude, s.longitude
-    ))
+    idx = nearest_index(math.radians(camera.latitude), math.radians(camera.longitude), lat_rad, lon_rad, cos_lat)
+    nearest_id = int(ids[idx])
     
-    return nearest
+    return await db.get(PoliceStation, nearest_id)
 
 
 # ============ Ambulance Providers ============
@@ -117,81 +163,90 @@ def create_ambulance_provider(
 
 # ============ Police Report ============
 
-@router.post("/send-police-report")
+@router.post("/send-police-report", response_class=ORJSONResponse)
 async def send_report_to_police(
     request: PoliceReportRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Send incident report to police station.
     This generates a preliminary incident intimation (NOT an FIR).
     """
-    incident = db.query(Incident).filter(Incident.id == request.incident_id).first()
+    result = await db.execute(
+        select(Incident).options(joinedload(Incident.camera)).where(Incident.id == request.incident_id)
+    )
+    incident = result.scalar_one_or_none()
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
     
     if incident.status == IncidentStatus.DETECTED:
         raise HTTPException(status_code=400, detail="Incident must be verified before reporting")
     
-    station = db.query(PoliceStation).filter(PoliceStation.id == request.police_station_id).first()
+    station = await db.get(PoliceStation, request.police_station_id)
     if not station:
         raise HTTPException(status_code=404, detail="Police station not found")
     
-    camera = db.query(Camera).filter(Camera.id == incident.camera_id).first()
+    camera = incident.camera
     
     # Generate report
     report_data = generate_incident_report(incident, camera, station, request.additional_notes)
     
-    # Create dispatch log
-    dispatch_log = DispatchLog(
-        incident_id=incident.id,
-        service_type="POLICE",
-        provider_id=station.station_id,
-        status=DispatchStatus.REQUESTED,
-        request_payload=report_data,
-        requested_by="operator"  # Should come from auth
+    # Create dispatch log and update incident status (Core statements, no ORM flush)
+    result = await db.execute(
+        insert(DispatchLog).values(
+            incident_id=incident.id,
+            service_type="POLICE",
+            provider_id=station.station_id,
+            status=DispatchStatus.REQUESTED,
+            request_payload=report_data,
+            requested_by="operator"  # Should come from auth
+        ).returning(DispatchLog.id)
+    )
+    dispatch_log_id = result.scalar_one()
+    await db.execute(
+        update(Incident).where(Incident.id == incident.id).values(status=IncidentStatus.REPORTED)
     )
-    db.add(dispatch_log)
     
-    # Update incident status
-    incident.status = IncidentStatus.REPORTED
-    db.commit()
+    # Queue the email in the same transaction; the outbox worker delivers it
+    if request.send_method == "email":
+        await send_police_report(station.email, report_data, db=db)
+    
+    await db.commit()
     
-    # Send report in background
     if request.send_method == "email":
-        background_tasks.add_task(send_police_report, station.email, report_data)
+        notification_worker.wake()
     
-    return {
+    return ORJSONResponse({
         "message": "Police report generated and sent",
         "incident_id": incident.incident_id,
         "police_station": station.name,
         "report": report_data,
-        "send_method": request.send_method
-    }
+        "send_method": request.send_method,
+        "dispatch_log_id": dispatch_log_id
+    })
 
 
-@router.get("/download-report/{incident_id}")
+@router.get("/download-report/{incident_id}", response_class=ORJSONResponse)
 def download_incident_report(incident_id: int, db: Session = Depends(get_db)):
     """Download incident report as JSON"""
-    incident = db.query(Incident).filter(Incident.id == incident_id).first()
+    incident = db.query(Incident).options(joinedload(Incident.camera)).filter(Incident.id == incident_id).first()
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
     
-    camera = db.query(Camera).filter(Camera.id == incident.camera_id).first()
+    camera = incident.camera
     
     report_data = generate_incident_report(incident, camera, None, None)
     
-    return report_data
+    return ORJSONResponse(report_data)
 
 
 # ============ Ambulance Dispatch ============
 
-@router.post("/ambulance")
+@router.post("/ambulance", response_class=ORJSONResponse)
 async def dispatch_ambulance_service(
     request: AmbulanceDispatchRequest,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Dispatch ambulance for an incident.
@@ -203,26 +258,28 @@ async def dispatch_ambulance_service(
             detail="Ambulance dispatch requires operator confirmation. Set confirmed=True after user confirms."
         )
     
-    incident = db.query(Incident).filter(Incident.id == request.incident_id).first()
+    result = await db.execute(
+        select(Incident).options(joinedload(Incident.camera)).where(Incident.id == request.incident_id)
+    )
+    incident = result.scalar_one_or_none()
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
     
     # Get camera for location
-    camera = db.query(Camera).filter(Camera.id == incident.camera_id).first()
+    camera = incident.camera
     if not camera:
         raise HTTPException(status_code=404, detail="Camera location not found")
     
     # Get provider
     provider = None
     if request.provider_id:
-        provider = db.query(AmbulanceProvider).filter(
-            AmbulanceProvider.id == request.provider_id
-        ).first()
+        provider = await db.get(AmbulanceProvider, request.provider_id)
     else:
         # Get first active provider
-        provider = db.query(AmbulanceProvider).filter(
-            AmbulanceProvider.is_active == True
-        ).first()
+        result = await db.execute(
+            select(AmbulanceProvider).where(AmbulanceProvider.is_active == True).limit(1)
+        )
+        provider = result.scalars().first()
     
     if not provider:
         raise HTTPException(status_code=404, detail="No ambulance provider available")
@@ -241,32 +298,35 @@ async def dispatch_ambulance_service(
         "description": f"{incident.incident_type.value} - {incident.vehicles_involved} vehicle(s) involved"
     }
     
-    # Create dispatch log
-    dispatch_log = DispatchLog(
-        incident_id=incident.id,
-        service_type="AMBULANCE",
-        provider_id=provider.provider_id,
-        status=DispatchStatus.DISPATCHED,
-        request_payload=dispatch_data,
-        requested_by=request.operator_id,
-        dispatched_at=datetime.now()
+    # Create dispatch log and update incident status (Core statements, no ORM flush)
+    result = await db.execute(
+        insert(DispatchLog).values(
+            incident_id=incident.id,
+            service_type="AMBULANCE",
+            provider_id=provider.provider_id,
+            status=DispatchStatus.DISPATCHED,
+            request_payload=dispatch_data,
+            requested_by=request.operator_id,
+            dispatched_at=func.now()
+        ).returning(DispatchLog.id)
     )
-    db.add(dispatch_log)
-    
-    # Update incident status
-    incident.status = IncidentStatus.DISPATCHED
-    db.commit()
+    dispatch_log_id = result.scalar_one()
+    await db.execute(
+        update(Incident).where(Incident.id == incident.id).values(status=IncidentStatus.DISPATCHED)
+    )
+    await db.commit()
     
     # Dispatch in background (API call or Twilio)
     background_tasks.add_task(dispatch_ambulance, provider, dispatch_data)
     
-    return {
+    return ORJSONResponse({
         "message": "Ambulance dispatched successfully",
         "incident_id": incident.incident_id,
         "provider": provider.name,
         "status": "DISPATCHED",
-        "dispatch_data": dispatch_data
-    }
+        "dispatch_data": dispatch_data,
+        "dispatch_log_id": dispatch_log_id
+    })
 
 
 # ============ Dispatch Logs ============
@@ -293,9 +353,9 @@ def update_dispatch_status(
     log.status = status
     
     if status == DispatchStatus.ARRIVED:
-        log.arrived_at = datetime.now()
+        log.arrived_at = func.now()
     elif status == DispatchStatus.CLOSED:
-        log.closed_at = datetime.now()
+        log.closed_at = func.now()
     
     if notes:
         log.notes = notes
@@ -2,231 +2,354 @@
 Incident Management Router
 """
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy import desc, select, insert, update, func, case, bindparam
 from typing import List, Optional
-from datetime import datetime, timedelta
+import asyncio
+import base64
+import time
 import uuid
 import os
-import shutil
+from aiofile import async_open
 
-from database import get_db
-from models import Incident, Camera, IncidentStatus, SeverityLevel
+from database import get_async_db
+from models import Incident, Camera, IncidentStatus, SeverityLevel, start_of_today
 from schemas import (
     IncidentCreate, IncidentUpdate, IncidentResponse, 
-    IncidentDetailResponse, DashboardStats
+    IncidentDetailResponse, IncidentPage, DashboardStats
 )
 from config import get_settings
+from services.video_jobs import video_jobs
 
 router = APIRouter(prefix="/incidents", tags=["Incidents"])
 settings = get_settings()
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
-def generate_incident_id():
-    """Generate unique incident ID"""
-    now = datetime.now()
-    return f"INC-{now.year}-{uuid.uuid4().hex[:6].upper()}"
+ALLOWED_VIDEO_EXTENSIONS = frozenset({".mp4", ".avi", ".mov", ".mkv"})
+ALLOWED_VIDEO_MIME_TYPES = frozenset({
+    "video/mp4", "video/x-msvideo", "video/avi", "video/quicktime",
+    "video/x-matroska", "video/webm",
+    # Some browsers don't know .mkv/.avi and send a generic type
+    "application/octet-stream"
+})
 
+STATS_CACHE_TTL = 2  # seconds
+_stats_cache = {"ts": 0.0, "value": None, "generation": 0}
+_stats_lock = asyncio.Lock()
 
-@router.get("/", response_model=List[IncidentResponse])
-def get_incidents(
+
+# Only the columns IncidentResponse reads; list rows skip ORM hydration entirely
+INCIDENT_LIST_COLUMNS = tuple(getattr(Incident, name) for name in IncidentResponse.model_fields)
+
+CLOSED_STATUSES = (IncidentStatus.CLOSED, IncidentStatus.FALSE_ALARM)
+
+
+# Hot statements are built once at import; requests only bind parameters
+# and hit SQLAlchemy's compiled cache
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+_ACTIVE_STMT = (
+    select(*INCIDENT_LIST_COLUMNS)
+    .where(Incident.status.notin_(CLOSED_STATUSES))
+    .order_by(desc(Incident.created_at))
+)
+
+# All dashboard counters in one pass over incidents
+_STATS_STMT = select(
+    _count_if(Incident.status.notin_(CLOSED_STATUSES)).label("active"),
+    _count_if(Incident.created_at >= start_of_today()).label("today"),
+    _count_if(Incident.status == IncidentStatus.DETECTED).label("pending"),
+    _count_if(Incident.status == IncidentStatus.DISPATCHED).label("dispatched"),
+    _count_if(Incident.status.in_([
+        IncidentStatus.REPORTED, IncidentStatus.DISPATCHED, IncidentStatus.CLOSED
+    ])).label("reported")
+)
+
+_DETAIL_STMT = (
+    select(Incident)
+    .options(joinedload(Incident.camera), selectinload(Incident.dispatch_logs))
+    .where(Incident.id == bindparam("pk"))
+)
+
+# Verify / false alarm: status + operator + timestamp
+_REVIEW_STMT = (
+    update(Incident)
+    .where(Incident.id == bindparam("pk"))
+    .values(
+        status=bindparam("new_status", type_=Incident.status.type),
+        verified_by=bindparam("operator", type_=Incident.verified_by.type),
+        verified_at=func.now()
+    )
+    .returning(Incident.incident_id)
+)
+
+_CLOSE_STMT = (
+    update(Incident)
+    .where(Incident.id == bindparam("pk"))
+    .values(status=IncidentStatus.CLOSED)
+    .returning(Incident.incident_id)
+)
+
+# String concatenation renders as || on both SQLite and PostgreSQL
+_CLOSE_WITH_NOTES_STMT = (
+    update(Incident)
+    .where(Incident.id == bindparam("pk"))
+    .values(
+        status=IncidentStatus.CLOSED,
+        description=func.coalesce(Incident.description, "") + bindparam("closure_notes", type_=Incident.description.type)
+    )
+    .returning(Incident.incident_id)
+)
+
+
+def encode_cursor(row_id: int) -> str:
+    """Opaque keyset cursor: the id of the last row on the page"""
+    return base64.urlsafe_b64encode(str(row_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        return int(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def invalidate_stats_cache():
+    _stats_cache["ts"] = 0.0
+    _stats_cache["generation"] += 1
+
+
+async def _get_incident_or_404(db: AsyncSession, incident_id: int) -> Incident:
+    incident = await db.get(Incident, incident_id)
+    if not incident:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    return incident
+
+
+async def _set_incident_fields(db: AsyncSession, stmt, params: dict) -> str:
+    """Run a state-change UPDATE ... RETURNING; returns the public incident_id"""
+    result = await db.execute(stmt, params)
+    public_id = result.scalar_one_or_none()
+    if public_id is None:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    await db.commit()
+    invalidate_stats_cache()
+    return public_id
+
+
+@router.get("/", response_model=IncidentPage)
+async def get_incidents(
     status: Optional[IncidentStatus] = None,
     severity: Optional[SeverityLevel] = None,
     limit: int = Query(50, le=100),
-    offset: int = 0,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all incidents with optional filters"""
-    query = db.query(Incident).order_by(desc(Incident.created_at))
+    """
+    Get incidents (newest first) with optional filters.
+    Pass next_cursor from the previous page to fetch the next one.
+    """
+    # Seek on the primary key alone: ids are assigned in insert order, so they
+    # sort newest first like created_at, without comparing a bound datetime
+    # against server-written timestamps (SQLite stores those as second-precision
+    # text, which sorts below the cursor's '.000000' form and repeats rows)
+    stmt = select(*INCIDENT_LIST_COLUMNS).order_by(desc(Incident.id))
     
     if status:
-        query = query.filter(Incident.status == status)
+        stmt = stmt.where(Incident.status == status)
     if severity:
-        query = query.filter(Incident.severity == severity)
+        stmt = stmt.where(Incident.severity == severity)
+    if cursor:
+        # Seek past the last row seen instead of scanning OFFSET rows
+        stmt = stmt.where(Incident.id < decode_cursor(cursor))
+    
+    result = await db.execute(stmt.limit(limit))
+    items = result.all()
     
-    return query.offset(offset).limit(limit).all()
+    next_cursor = None
+    if len(items) == limit:
+        next_cursor = encode_cursor(items[-1].id)
+    
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @router.get("/active", response_model=List[IncidentResponse])
-def get_active_incidents(db: Session = Depends(get_db)):
+async def get_active_incidents(db: AsyncSession = Depends(get_async_db)):
     """Get all active (non-closed) incidents"""
-    return db.query(Incident).filter(
-        Incident.status.notin_([IncidentStatus.CLOSED, IncidentStatus.FALSE_ALARM])
-    ).order_by(desc(Incident.created_at)).all()
+    result = await db.execute(_ACTIVE_STMT)
+    return result.all()
 
 
 @router.get("/stats", response_model=DashboardStats)
-def get_dashboard_stats(db: Session = Depends(get_db)):
-    """Get dashboard statistics"""
-    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    
-    active = db.query(Incident).filter(
-        Incident.status.notin_([IncidentStatus.CLOSED, IncidentStatus.FALSE_ALARM])
-    ).count()
+async def get_dashboard_stats(db: AsyncSession = Depends(get_async_db)):
+    """Get dashboard statistics (cached for a couple of seconds)"""
+    if _stats_cache["value"] is not None and time.monotonic() - _stats_cache["ts"] < STATS_CACHE_TTL:
+        return _stats_cache["value"]
     
-    today_count = db.query(Incident).filter(
-        Incident.created_at >= today
-    ).count()
-    
-    pending = db.query(Incident).filter(
-        Incident.status == IncidentStatus.DETECTED
-    ).count()
-    
-    dispatched = db.query(Incident).filter(
-        Incident.status == IncidentStatus.DISPATCHED
-    ).count()
-    
-    reported = db.query(Incident).filter(
-        Incident.status.in_([IncidentStatus.REPORTED, IncidentStatus.DISPATCHED, IncidentStatus.CLOSED])
-    ).count()
+    # Single-flight: concurrent polls wait for one query instead of stampeding
+    async with _stats_lock:
+        if _stats_cache["value"] is not None and time.monotonic() - _stats_cache["ts"] < STATS_CACHE_TTL:
+            return _stats_cache["value"]
+        
+        started = time.monotonic()
+        generation = _stats_cache["generation"]
+        value = await _compute_dashboard_stats(db)
+        
+        # A write during the query leaves the entry expired
+        _stats_cache["value"] = value
+        if _stats_cache["generation"] == generation:
+            _stats_cache["ts"] = started
+        return value
+
+
+async def _compute_dashboard_stats(db: AsyncSession) -> DashboardStats:
+    result = await db.execute(_STATS_STMT)
+    row = result.one()
     
     return DashboardStats(
-        active_incidents=active,
-        today_incidents=today_count,
-        pending_verification=pending,
-        dispatched_ambulances=dispatched,
-        police_reports_sent=reported
+        active_incidents=row.active,
+        today_incidents=row.today,
+        pending_verification=row.pending,
+        dispatched_ambulances=row.dispatched,
+        police_reports_sent=row.reported
     )
 
 
 @router.get("/{incident_id}", response_model=IncidentDetailResponse)
-def get_incident(incident_id: int, db: Session = Depends(get_db)):
+async def get_incident(incident_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get incident by ID with full details"""
-    incident = db.query(Incident).filter(Incident.id == incident_id).first()
+    result = await db.execute(_DETAIL_STMT, {"pk": incident_id})
+    incident = result.scalar_one_or_none()
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
     return incident
 
 
 @router.post("/", response_model=IncidentResponse)
-def create_incident(incident: IncidentCreate, db: Session = Depends(get_db)):
+async def create_incident(incident: IncidentCreate, db: AsyncSession = Depends(get_async_db)):
     """Create new incident (typically called by ML engine)"""
     # Verify camera exists
-    camera = db.query(Camera).filter(Camera.id == incident.camera_id).first()
+    camera = await db.get(Camera, incident.camera_id)
     if not camera:
         raise HTTPException(status_code=404, detail="Camera not found")
     
-    db_incident = Incident(
-        incident_id=generate_incident_id(),
-        camera_id=incident.camera_id,
-        incident_type=incident.incident_type,
-        severity=incident.severity,
-        confidence_score=incident.confidence_score,
-        vehicles_involved=incident.vehicles_involved,
-        pedestrian_involved=incident.pedestrian_involved,
-        description=incident.description,
-        video_clip_path=incident.video_clip_path,
-        snapshots=incident.snapshots,
-        bounding_boxes=incident.bounding_boxes,
-        status=IncidentStatus.DETECTED
+    # INSERT ... RETURNING brings back id/incident_id/timestamps without a refresh SELECT
+    result = await db.execute(
+        insert(Incident)
+        .values(**incident.model_dump(), status=IncidentStatus.DETECTED)
+        .returning(Incident)
     )
+    db_incident = result.scalar_one()
     
-    db.add(db_incident)
-    db.commit()
-    db.refresh(db_incident)
+    await db.commit()
+    invalidate_stats_cache()
     
     return db_incident
 
 
 @router.patch("/{incident_id}", response_model=IncidentResponse)
-def update_incident(
+async def update_incident(
     incident_id: int, 
-    update: IncidentUpdate, 
-    db: Session = Depends(get_db)
+    changes: IncidentUpdate, 
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update incident status or details"""
-    incident = db.query(Incident).filter(Incident.id == incident_id).first()
-    if not incident:
-        raise HTTPException(status_code=404, detail="Incident not found")
-    
-    update_data = update.model_dump(exclude_unset=True)
+    update_data = changes.model_dump(exclude_unset=True)
+    if not update_data:
+        return await _get_incident_or_404(db, incident_id)
     
-    if update.status == IncidentStatus.VERIFIED and update.verified_by:
-        update_data["verified_at"] = datetime.now()
+    if changes.status == IncidentStatus.VERIFIED and changes.verified_by:
+        update_data["verified_at"] = func.now()
     
-    for key, value in update_data.items():
-        setattr(incident, key, value)
+    # One UPDATE ... RETURNING round trip that also hydrates the response row
+    result = await db.execute(
+        update(Incident)
+        .where(Incident.id == incident_id)
+        .values(**update_data)
+        .returning(Incident)
+    )
+    incident = result.scalar_one_or_none()
+    if incident is None:
+        raise HTTPException(status_code=404, detail="Incident not found")
     
-    db.commit()
-    db.refresh(incident)
+    await db.commit()
+    invalidate_stats_cache()
     
     return incident
 
 
 @router.post("/{incident_id}/verify")
-def verify_incident(
+async def verify_incident(
     incident_id: int,
     verified_by: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Mark incident as verified by operator"""
-    incident = db.query(Incident).filter(Incident.id == incident_id).first()
-    if not incident:
-        raise HTTPException(status_code=404, detail="Incident not found")
-    
-    incident.status = IncidentStatus.VERIFIED
-    incident.verified_by = verified_by
-    incident.verified_at = datetime.now()
-    
-    db.commit()
+    public_id = await _set_incident_fields(db, _REVIEW_STMT, {
+        "pk": incident_id,
+        "new_status": IncidentStatus.VERIFIED,
+        "operator": verified_by
+    })
     
-    return {"message": "Incident verified successfully", "incident_id": incident.incident_id}
+    return {"message": "Incident verified successfully", "incident_id": public_id}
 
 
 @router.post("/{incident_id}/false-alarm")
-def mark_false_alarm(
+async def mark_false_alarm(
     incident_id: int,
     marked_by: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Mark incident as false alarm"""
-    incident = db.query(Incident).filter(Incident.id == incident_id).first()
-    if not incident:
-        raise HTTPException(status_code=404, detail="Incident not found")
-    
-    incident.status = IncidentStatus.FALSE_ALARM
-    incident.verified_by = marked_by
-    incident.verified_at = datetime.now()
-    
-    db.commit()
+    public_id = await _set_incident_fields(db, _REVIEW_STMT, {
+        "pk": incident_id,
+        "new_status": IncidentStatus.FALSE_ALARM,
+        "operator": marked_by
+    })
     
-    return {"message": "Incident marked as false alarm", "incident_id": incident.incident_id}
+    return {"message": "Incident marked as false alarm", "incident_id": public_id}
 
 
 @router.post("/{incident_id}/close")
-def close_incident(
+async def close_incident(
     incident_id: int,
     closed_by: str,
     notes: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Close an incident"""
-    incident = db.query(Incident).filter(Incident.id == incident_id).first()
-    if not incident:
-        raise HTTPException(status_code=404, detail="Incident not found")
-    
-    incident.status = IncidentStatus.CLOSED
     if notes:
-        incident.description = (incident.description or "") + f"\n\nClosure notes: {notes}"
-    
-    db.commit()
+        public_id = await _set_incident_fields(db, _CLOSE_WITH_NOTES_STMT, {
+            "pk": incident_id,
+            "closure_notes": f"\n\nClosure notes: {notes}"
+        })
+    else:
+        public_id = await _set_incident_fields(db, _CLOSE_STMT, {"pk": incident_id})
     
-    return {"message": "Incident closed", "incident_id": incident.incident_id}
+    return {"message": "Incident closed", "incident_id": public_id}
 
 
 @router.post("/upload-video")
 async def upload_video(
     camera_id: int,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Upload video for ML processing and incident detection"""
-    # Validate file type
-    if not file.filename.endswith(('.mp4', '.avi', '.mov', '.mkv')):
+    # Validate file type before touching disk
+    ext = os.path.splitext(file.filename or "")[1].lower()
+    if ext not in ALLOWED_VIDEO_EXTENSIONS:
         raise HTTPException(status_code=400, detail="Invalid video format. Supported: MP4, AVI, MOV, MKV")
+    if file.content_type and file.content_type not in ALLOWED_VIDEO_MIME_TYPES:
+        raise HTTPException(status_code=400, detail=f"Invalid content type: {file.content_type}")
     
     # Verify camera exists
-    camera = db.query(Camera).filter(Camera.id == camera_id).first()
+    camera = await db.get(Camera, camera_id)
     if not camera:
         raise HTTPException(status_code=404, detail=f"Camera {camera_id} not found")
     
@@ -237,46 +360,33 @@ async def upload_video(
     file_id = uuid.uuid4().hex
     file_path = os.path.join(settings.UPLOAD_DIR, f"{file_id}_{file.filename}")
     
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    # Process video and detect incidents
-    from services.video_processor import process_video_async
-    import asyncio
+    # Stream in fixed-size chunks so large videos don't pin the event loop
+    # (aiofile uses Linux native AIO via caio, threads elsewhere)
+    async with async_open(file_path, "wb") as out:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(out.file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await out.write(chunk)
     
+    # Hand off to the background workers; poll /incidents/job/{file_id} for the result
     try:
-        result = await process_video_async(file_path, camera_id, db)
-        
-        if result.get("detected"):
-            return {
-                "message": "🚨 INCIDENT DETECTED!",
-                "file_id": file_id,
-                "incident_created": True,
-                "incident_id": result.get("incident_id"),
-                "incident_db_id": result.get("incident_db_id"),
-                "incident_type": result.get("incident_type"),
-                "severity": result.get("severity"),
-                "confidence_score": result.get("confidence_score"),
-                "description": result.get("description"),
-                "status": "incident_created"
-            }
-        else:
-            return {
-                "message": "Video analyzed - No incidents detected",
-                "file_id": file_id,
-                "incident_created": False,
-                "analysis_summary": result.get("analysis_summary"),
-                "status": "no_incident"
-            }
-    except Exception as e:
-        # Log error but still return success for upload
-        print(f"Error processing video: {e}")
-        return {
-            "message": "Video uploaded but processing failed",
-            "file_id": file_id,
-            "file_path": file_path,
-            "camera_id": camera_id,
-            "status": "processing_error",
-            "error": str(e)
-        }
+        video_jobs.enqueue(file_id, file_path, camera_id)
+    except asyncio.QueueFull:
+        os.remove(file_path)
+        raise HTTPException(status_code=503, detail="Video processing queue is full, try again later")
+    
+    return {
+        "message": "Video uploaded, queued for processing",
+        "file_id": file_id,
+        "camera_id": camera_id,
+        "status": "queued"
+    }
+
 
+@router.get("/job/{file_id}")
+def get_video_job(file_id: str):
+    """Get status/result of a queued video processing job"""
+    job = video_jobs.get(file_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -103,6 +103,11 @@ class IncidentResponse(IncidentBase):
         from_attributes = True
 
 
+class IncidentPage(BaseModel):
+    items: List[IncidentResponse]
+    next_cursor: Optional[str] = None
+
+
 class IncidentDetailResponse(IncidentResponse):
     camera: Optional[CameraResponse] = None
     dispatch_logs: List["DispatchLogResponse"] = []
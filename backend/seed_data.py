@@ -5,12 +5,37 @@ Run this script to populate the database with sample data for testing.
 import sys
 sys.path.append('.')
 
-from database import SessionLocal, init_db
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database import SessionLocal, engine, init_db
 from models import Camera, PoliceStation, AmbulanceProvider, Incident, IncidentType, SeverityLevel, IncidentStatus
+from services.geo import init_station_rtree
 from datetime import datetime, timedelta
 import random
 
 
+def insert_missing(db, model, rows, key: str):
+    """
+    Insert rows in one statement, skipping any whose unique key already exists.
+    Returns the keys that were actually inserted.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(model).on_conflict_do_nothing(index_elements=[key])
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(model).on_conflict_do_nothing(index_elements=[key])
+    else:
+        existing = {k for (k,) in db.query(getattr(model, key)).all()}
+        rows = [row for row in rows if row[key] not in existing]
+        if not rows:
+            return []
+        stmt = insert(model)
+    
+    stmt = stmt.values(rows).returning(getattr(model, key))
+    return db.execute(stmt).scalars().all()
+
+
 def seed_cameras(db):
     """Add demo cameras"""
     cameras = [
@@ -52,11 +77,8 @@ def seed_cameras(db):
         }
     ]
     
-    for cam in cameras:
-        existing = db.query(Camera).filter(Camera.camera_id == cam["camera_id"]).first()
-        if not existing:
-            db.add(Camera(**cam))
-            print(f"Added camera: {cam['camera_id']}")
+    for camera_id in insert_missing(db, Camera, cameras, "camera_id"):
+        print(f"Added camera: {camera_id}")
     
     db.commit()
 
@@ -96,13 +118,13 @@ def seed_police_stations(db):
         }
     ]
     
-    for station in stations:
-        existing = db.query(PoliceStation).filter(PoliceStation.station_id == station["station_id"]).first()
-        if not existing:
-            db.add(PoliceStation(**station))
-            print(f"Added police station: {station['station_id']}")
+    for station_id in insert_missing(db, PoliceStation, stations, "station_id"):
+        print(f"Added police station: {station_id}")
     
     db.commit()
+    
+    # Core inserts bypass the ORM hooks that maintain the station R-Tree
+    init_station_rtree(engine)
 
 
 def seed_ambulance_providers(db):
@@ -134,11 +156,8 @@ def seed_ambulance_providers(db):
         }
     ]
     
-    for prov in providers:
-        existing = db.query(AmbulanceProvider).filter(AmbulanceProvider.provider_id == prov["provider_id"]).first()
-        if not existing:
-            db.add(AmbulanceProvider(**prov))
-            print(f"Added ambulance provider: {prov['provider_id']}")
+    for provider_id in insert_missing(db, AmbulanceProvider, providers, "provider_id"):
+        print(f"Added ambulance provider: {provider_id}")
     
     db.commit()
 
@@ -189,17 +208,18 @@ def seed_sample_incidents(db):
         }
     ]
     
-    for i, inc_data in enumerate(incidents_data):
-        camera = random.choice(cameras)
-        
-        incident = Incident(
-            incident_id=f"INC-2026-{random.randint(100000, 999999):06X}",
-            camera_id=camera.id,
+    rows = [
+        dict(
+            camera_id=random.choice(cameras).id,
             timestamp=datetime.now() - timedelta(minutes=random.randint(5, 120)),
             **inc_data
         )
-        db.add(incident)
-        print(f"Added incident: {incident.incident_id}")
+        for inc_data in incidents_data
+    ]
+    incident_ids = db.execute(insert(Incident).returning(Incident.incident_id), rows).scalars().all()
+    
+    for incident_id in incident_ids:
+        print(f"Added incident: {incident_id}")
     
     db.commit()
 
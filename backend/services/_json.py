@@ -0,0 +1,41 @@
+"""
+JSON helpers
+orjson when available, stdlib json otherwise
+"""
+import json
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def dumps(obj, indent: bool = False) -> bytes:
+    """
+    Serialize to UTF-8 JSON bytes. Datetimes, UUIDs, enums and numpy arrays are
+    handled natively by orjson; anything else falls back to str().
+    """
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=str, option=option)
+    return json.dumps(obj, indent=2 if indent else None, default=str, ensure_ascii=False).encode()
+
+
+class LazyJSON:
+    """
+    Log argument that serializes only when the record is actually emitted:
+    logger.info("Report data: %s", LazyJSON(report))
+    """
+    __slots__ = ("obj", "indent")
+
+    def __init__(self, obj, indent: bool = False):
+        self.obj = obj
+        self.indent = indent
+
+    def __str__(self) -> str:
+        if isinstance(self.obj, bytes):
+            return self.obj.decode()
+        return dumps(self.obj, indent=self.indent).decode()
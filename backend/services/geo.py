@@ -0,0 +1,152 @@
+"""
+Geo Service
+Spatial index helpers for nearest police station lookups
+"""
+import math
+import logging
+from typing import List, Tuple
+
+import numpy as np
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+from models import PoliceStation
+
+# Try to import Numba for compiled distance kernels
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def _nearest_index_numpy(lat0: float, lon0: float, lat_rad: np.ndarray, lon_rad: np.ndarray, cos_lat: np.ndarray) -> int:
+    """
+    Index of the point closest to (lat0, lon0); angles in radians, cos_lat = cos(lat_rad).
+    Only the Haversine "a" term is computed since it is monotonic in distance.
+    """
+    a = np.sin((lat_rad - lat0) / 2)**2 + math.cos(lat0) * cos_lat * np.sin((lon_rad - lon0) / 2)**2
+    return int(np.argmin(a))
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True, parallel=True)
+    def _nearest_index_jit(lat0, lon0, lat_rad, lon_rad, cos_lat):
+        n = lat_rad.shape[0]
+        a = np.empty(n)
+        cos_lat0 = math.cos(lat0)
+        for i in prange(n):
+            a[i] = math.sin((lat_rad[i] - lat0) / 2)**2 + cos_lat0 * cos_lat[i] * math.sin((lon_rad[i] - lon0) / 2)**2
+        return np.argmin(a)
+    
+    def nearest_index(lat0: float, lon0: float, lat_rad: np.ndarray, lon_rad: np.ndarray, cos_lat: np.ndarray) -> int:
+        """Index of the point closest to (lat0, lon0); angles in radians, cos_lat = cos(lat_rad)"""
+        return int(_nearest_index_jit(lat0, lon0, lat_rad, lon_rad, cos_lat))
+else:
+    nearest_index = _nearest_index_numpy
+
+
+def warmup():
+    """Compile the nearest-station kernel so JIT cost doesn't land on the first request"""
+    nearest_index(0.0, 0.0, np.zeros(2), np.zeros(2), np.ones(2))
+
+
+RTREE_TABLE = "rtree_stations"
+
+# Set once the R-Tree virtual table exists (SQLite built with the rtree module)
+_rtree_available = False
+
+
+def unit_xyz(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    """
+    Convert lat/lon (degrees) to a point on the unit sphere.
+    Chord distance between these points is monotonic with Haversine distance.
+    """
+    lat_rad = math.radians(latitude)
+    lon_rad = math.radians(longitude)
+    cos_lat = math.cos(lat_rad)
+    return cos_lat * math.cos(lon_rad), cos_lat * math.sin(lon_rad), math.sin(lat_rad)
+
+
+def rtree_available() -> bool:
+    return _rtree_available
+
+
+def _index_station(conn, station_id: int, latitude, longitude, is_active) -> None:
+    """Insert/replace (or remove) one station in the R-Tree"""
+    conn.execute(text(f"DELETE FROM {RTREE_TABLE} WHERE id = :id"), {"id": station_id})
+    if not is_active or latitude is None or longitude is None:
+        return
+    x, y, z = unit_xyz(latitude, longitude)
+    conn.execute(
+        text(f"INSERT INTO {RTREE_TABLE} VALUES (:id, :x, :x, :y, :y, :z, :z)"),
+        {"id": station_id, "x": x, "y": y, "z": z}
+    )
+
+
+def init_station_rtree(engine) -> None:
+    """Create the station R-Tree (SQLite only) and rebuild it from police_stations"""
+    global _rtree_available
+    if engine.dialect.name != "sqlite":
+        return
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {RTREE_TABLE} "
+                "USING rtree(id, minX, maxX, minY, maxY, minZ, maxZ)"
+            ))
+            conn.execute(text(f"DELETE FROM {RTREE_TABLE}"))
+            rows = conn.execute(text(
+                "SELECT id, latitude, longitude, is_active FROM police_stations"
+            )).all()
+            for row in rows:
+                _index_station(conn, *row)
+        _rtree_available = True
+    except OperationalError as e:
+        logger.warning(f"SQLite R-Tree unavailable, using full station scan: {e}")
+
+
+@event.listens_for(PoliceStation, "after_insert")
+@event.listens_for(PoliceStation, "after_update")
+def _sync_station_rtree(mapper, connection, target):
+    """Keep the R-Tree in step with police_stations writes"""
+    if _rtree_available:
+        _index_station(connection, target.id, target.latitude, target.longitude, target.is_active)
+
+
+def _query_box(db, center: Tuple[float, float, float], half_width: float) -> List[int]:
+    x, y, z = center
+    rows = db.execute(
+        text(
+            f"SELECT id FROM {RTREE_TABLE} "
+            "WHERE minX >= :x0 AND maxX <= :x1 "
+            "AND minY >= :y0 AND maxY <= :y1 "
+            "AND minZ >= :z0 AND maxZ <= :z1"
+        ),
+        {
+            "x0": x - half_width, "x1": x + half_width,
+            "y0": y - half_width, "y1": y + half_width,
+            "z0": z - half_width, "z1": z + half_width,
+        }
+    ).all()
+    return [r[0] for r in rows]
+
+
+def nearby_station_ids(db, latitude: float, longitude: float, half_width: float = 0.01) -> List[int]:
+    """
+    Candidate station ids guaranteed to contain the nearest active station.
+    Widens the search box until something is found, then widens once more by
+    sqrt(3) so points closer than the box corners are not missed.
+    """
+    center = unit_xyz(latitude, longitude)
+    while True:
+        ids = _query_box(db, center, half_width)
+        if ids:
+            return _query_box(db, center, half_width * math.sqrt(3))
+        if half_width >= 2.0:
+            # Chord distance never exceeds 2, so the whole sphere was searched
+            return []
+        half_width = min(half_width * 4, 2.0)
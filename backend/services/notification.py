@@ -2,65 +2,258 @@
 Notification Service
 Handles email sending and API calls for police reports and ambulance dispatch
 """
+import asyncio
+import aiosmtplib
 import httpx
-import smtplib
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
-import json
 import logging
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import insert
 from config import get_settings
+from database import AsyncSessionLocal
+from models import NotificationOutbox
+from services import _json
+from services.report_generator import serialize_report
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+SMTP_MAX_CONNECTIONS = 4
+SMTP_IDLE_TIMEOUT = 60  # seconds
 
-async def send_police_report(email: str, report_data: dict):
+# Shared client for ambulance provider APIs (keep-alive + HTTP/2 across dispatches)
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+async def get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            timeout=30.0
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared HTTP client (call on app shutdown)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+class SMTPConnectionPool:
+    """
+    Keeps authenticated aiosmtplib sessions (past STARTTLS + LOGIN) for reuse.
+    Sessions are async end to end, so concurrent sends overlap on the event loop.
+    """
+    
+    def __init__(self, host: str, port: int, user: str, password: str,
+                 max_connections: int = SMTP_MAX_CONNECTIONS, idle_timeout: float = SMTP_IDLE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.idle_timeout = idle_timeout
+        self._idle: List[Tuple[aiosmtplib.SMTP, float]] = []
+        self._slots = asyncio.Semaphore(max_connections)
+    
+    async def _connect(self) -> aiosmtplib.SMTP:
+        server = aiosmtplib.SMTP(hostname=self.host, port=self.port, start_tls=True, timeout=30)
+        await server.connect()
+        await server.login(self.user, self.password)
+        return server
+    
+    @staticmethod
+    async def _close(server: aiosmtplib.SMTP):
+        try:
+            await server.quit()
+        except aiosmtplib.SMTPException:
+            server.close()
+    
+    def _checkout(self) -> Optional[aiosmtplib.SMTP]:
+        """Most recently used idle session; stale ones are returned for closing"""
+        now = time.monotonic()
+        stale = []
+        server = None
+        while self._idle:
+            candidate, last_used = self._idle.pop()
+            if now - last_used < self.idle_timeout:
+                server = candidate
+                break
+            stale.append(candidate)
+        for old in stale:
+            old.close()
+        return server
+    
+    async def send_message(self, msg):
+        async with self._slots:
+            server = self._checkout()
+            if server is not None:
+                try:
+                    await server.rset()
+                except aiosmtplib.SMTPException:
+                    server.close()
+                    server = None
+            if server is None:
+                server = await self._connect()
+            
+            try:
+                await server.send_message(msg)
+            except aiosmtplib.SMTPServerDisconnected:
+                # Server dropped the session between probe and send; retry once
+                server = await self._connect()
+                await server.send_message(msg)
+            except Exception:
+                server.close()
+                raise
+            self._idle.append((server, time.monotonic()))
+    
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for server, _ in idle:
+            await self._close(server)
+
+
+# Pools keyed on (host, port, user)
+_smtp_pools: Dict[Tuple[str, int, str], SMTPConnectionPool] = {}
+
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    key = (settings.SMTP_HOST, settings.SMTP_PORT, settings.SMTP_USER)
+    pool = _smtp_pools.get(key)
+    if pool is None:
+        pool = _smtp_pools[key] = SMTPConnectionPool(
+            settings.SMTP_HOST, settings.SMTP_PORT, settings.SMTP_USER, settings.SMTP_PASSWORD
+        )
+    return pool
+
+
+async def close_smtp_pools():
+    """Close idle SMTP sessions (call on app shutdown)"""
+    for pool in _smtp_pools.values():
+        await pool.close()
+    _smtp_pools.clear()
+
+
+_EMAIL_BODY_TMPL = (
+    "PRELIMINARY INCIDENT INTIMATION\n"
+    "\n"
+    "Incident ID: {incident_id}\n"
+    "Type: {incident_type}\n"
+    "Severity: {severity}\n"
+    "Location: {address}\n"
+    "\n"
+    "This is an automated notification from the Accident Incident Responder System.\n"
+    "Please verify and take appropriate action.\n"
+    "\n"
+    "Full report attached.\n"
+)
+
+_SMS_BODY_TMPL = (
+    "🚨 EMERGENCY AMBULANCE REQUEST\n"
+    "\n"
+    "Incident: {incident_id}\n"
+    "Severity: {severity}\n"
+    "Location: {address}\n"
+    "Coordinates: {latitude}, {longitude}\n"
+    "\n"
+    "Callback: {callback_number}\n"
+)
+
+
+def extract_fields(report_data: dict) -> dict:
+    """Flatten the police report fields used by the email subject/body"""
+    details = report_data['incident_details']
+    return {
+        "incident_id": details['incident_id'],
+        "incident_type": details['incident_type'],
+        "severity": details['severity'],
+        "address": report_data['location']['address'],
+    }
+
+
+def extract_dispatch_fields(dispatch_data: dict) -> dict:
+    """Flatten the ambulance dispatch fields used by the SMS body"""
+    location = dispatch_data['location']
+    return {
+        "incident_id": dispatch_data['incident_id'],
+        "severity": dispatch_data['severity'],
+        "address": location['address'],
+        "latitude": location['latitude'],
+        "longitude": location['longitude'],
+        "callback_number": dispatch_data['callback_number'],
+    }
+
+
+async def send_police_report(email: str, report_data: dict, db=None):
+    """
+    Queue a police report email in the notifications outbox.
+    Delivery (and retries) happen in the outbox worker.
+    Pass db to enqueue inside the caller's transaction; the caller then
+    commits and calls notification_worker.wake().
+    """
+    # notification_worker imports this module, so import it on first use
+    from services.notification_worker import notification_worker
+    
+    stmt = (
+        insert(NotificationOutbox)
+        .values(kind="police_report", payload={"email": email, "report": report_data})
+        .returning(NotificationOutbox.id)
+    )
+    
+    if db is not None:
+        outbox_id = (await db.execute(stmt)).scalar_one()
+    else:
+        async with AsyncSessionLocal() as session:
+            outbox_id = (await session.execute(stmt)).scalar_one()
+            await session.commit()
+        notification_worker.wake()
+    
+    logger.info(f"Police report to {email} queued (outbox #{outbox_id})")
+    return {"status": "queued", "outbox_id": outbox_id}
+
+
+async def deliver_police_report(email: str, report_data: dict, serialized: Optional[bytes] = None):
     """
     Send police report via email.
     In demo mode, just logs the action.
+    Pass serialized (from serialize_report) to reuse an already-encoded report.
     """
     logger.info(f"Sending police report to: {email}")
     
     if not settings.SMTP_HOST:
-        # Demo mode - just log
+        # Demo mode - just log; the report is only serialized if INFO is enabled
         logger.info(f"[DEMO MODE] Police report would be sent to {email}")
-        logger.info(f"Report data: {json.dumps(report_data, indent=2, default=str)}")
+        logger.info("Report data: %s", _json.LazyJSON(serialized if serialized is not None else report_data))
         return {"status": "demo", "message": "Email not configured - report logged"}
     
+    if serialized is None:
+        serialized = serialize_report(report_data)
+    
     try:
+        fields = extract_fields(report_data)
+        
         msg = MIMEMultipart()
         msg['From'] = settings.SMTP_USER
         msg['To'] = email
-        msg['Subject'] = f"Incident Report - {report_data['incident_details']['incident_id']}"
+        msg['Subject'] = f"Incident Report - {fields['incident_id']}"
         
         # Email body
-        body = f"""
-        PRELIMINARY INCIDENT INTIMATION
-        
-        Incident ID: {report_data['incident_details']['incident_id']}
-        Type: {report_data['incident_details']['incident_type']}
-        Severity: {report_data['incident_details']['severity']}
-        Location: {report_data['location']['address']}
-        
-        This is an automated notification from the Accident Incident Responder System.
-        Please verify and take appropriate action.
-        
-        Full report attached.
-        """
-        
-        msg.attach(MIMEText(body, 'plain'))
+        msg.attach(MIMEText(_EMAIL_BODY_TMPL.format_map(fields), 'plain'))
         
         # Attach JSON report
-        attachment = MIMEApplication(json.dumps(report_data, indent=2, default=str).encode())
-        attachment['Content-Disposition'] = f'attachment; filename="incident_report_{report_data["incident_details"]["incident_id"]}.json"'
+        attachment = MIMEApplication(serialized)
+        attachment['Content-Disposition'] = f'attachment; filename="incident_report_{fields["incident_id"]}.json"'
         msg.attach(attachment)
         
-        # Send email
-        with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-            server.starttls()
-            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-            server.send_message(msg)
+        # Send email over a pooled, already-authenticated session
+        await get_smtp_pool().send_message(msg)
         
         logger.info(f"Police report sent successfully to {email}")
         return {"status": "sent", "email": email}
@@ -80,7 +273,7 @@ async def dispatch_ambulance(provider, dispatch_data: dict):
     # Demo mode - just log
     if not provider.api_endpoint and not settings.TWILIO_ACCOUNT_SID:
         logger.info(f"[DEMO MODE] Ambulance dispatch to {provider.name}")
-        logger.info(f"Dispatch data: {json.dumps(dispatch_data, indent=2, default=str)}")
+        logger.info("Dispatch data: %s", _json.LazyJSON(dispatch_data, indent=True))
         return {
             "status": "demo",
             "message": "Ambulance API not configured - dispatch logged",
@@ -90,19 +283,18 @@ async def dispatch_ambulance(provider, dispatch_data: dict):
     # Try API endpoint if available
     if provider.api_endpoint:
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    provider.api_endpoint,
-                    json=dispatch_data,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                logger.info(f"Ambulance dispatched via API: {response.json()}")
-                return {
-                    "status": "dispatched",
-                    "provider": provider.name,
-                    "response": response.json()
-                }
+            client = await get_http_client()
+            response = await client.post(
+                provider.api_endpoint,
+                json=dispatch_data
+            )
+            response.raise_for_status()
+            logger.info(f"Ambulance dispatched via API: {response.json()}")
+            return {
+                "status": "dispatched",
+                "provider": provider.name,
+                "response": response.json()
+            }
         except Exception as e:
             logger.error(f"API dispatch failed: {str(e)}")
             # Fall through to Twilio if available
@@ -114,16 +306,7 @@ async def dispatch_ambulance(provider, dispatch_data: dict):
             
             client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
             
-            message_body = f"""
-            🚨 EMERGENCY AMBULANCE REQUEST
-            
-            Incident: {dispatch_data['incident_id']}
-            Severity: {dispatch_data['severity']}
-            Location: {dispatch_data['location']['address']}
-            Coordinates: {dispatch_data['location']['latitude']}, {dispatch_data['location']['longitude']}
-            
-            Callback: {dispatch_data['callback_number']}
-            """
+            message_body = _SMS_BODY_TMPL.format_map(extract_dispatch_fields(dispatch_data))
             
             message = client.messages.create(
                 body=message_body,
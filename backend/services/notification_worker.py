@@ -0,0 +1,156 @@
+"""
+Notification Outbox Worker
+Drains notifications_outbox in the background, retrying failed sends with backoff
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, func, update
+
+from database import AsyncSessionLocal
+from models import NotificationOutbox, OutboxStatus
+from services.notification import deliver_police_report
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 5  # seconds
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 10  # seconds; doubles per attempt
+BACKOFF_MAX = 3600
+SEND_TIMEOUT = 60  # seconds per delivery attempt
+# Claimed rows are pushed this far into the future while their sends run; if
+# the worker dies before recording outcomes they become due again afterwards
+CLAIM_LEASE = 5 * SEND_TIMEOUT  # seconds
+
+
+async def _deliver(kind: str, payload: dict) -> Optional[str]:
+    """Send one outbox entry; returns an error message on failure"""
+    if kind == "police_report":
+        result = await deliver_police_report(payload["email"], payload["report"])
+        if result.get("status") == "error":
+            return result.get("message") or "send failed"
+        return None
+    return f"Unknown notification kind: {kind}"
+
+
+class NotificationWorker:
+    """
+    Single background task that claims due outbox rows
+    (FOR UPDATE SKIP LOCKED where supported) in a short transaction, sends
+    them concurrently through the pooled clients with no transaction open,
+    and records the outcomes in a second transaction.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        """Process the outbox now instead of at the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                processed = await self.drain_once()
+            except Exception as e:
+                logger.error(f"Notification outbox pass failed: {e}")
+                processed = 0
+
+            if processed == BATCH_SIZE:
+                continue  # more may be due
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def drain_once(self) -> int:
+        """Deliver one batch of due notifications; returns how many were attempted"""
+        entries = await self._claim_due()
+        if not entries:
+            return 0
+
+        errors = await asyncio.gather(
+            *(asyncio.wait_for(_deliver(kind, payload), timeout=SEND_TIMEOUT) for _, kind, payload in entries),
+            return_exceptions=True
+        )
+
+        await self._record_outcomes({entry_id: error for (entry_id, _, _), error in zip(entries, errors)})
+        return len(entries)
+
+    async def _claim_due(self) -> List[Tuple[int, str, dict]]:
+        """Lease up to BATCH_SIZE due rows and commit; returns (id, kind, payload)"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(NotificationOutbox.id, NotificationOutbox.kind, NotificationOutbox.payload)
+                .where(
+                    NotificationOutbox.status == OutboxStatus.PENDING,
+                    NotificationOutbox.next_retry_at <= func.now()
+                )
+                .order_by(NotificationOutbox.next_retry_at)
+                .limit(BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            entries = [tuple(row) for row in result.all()]
+            if entries:
+                await db.execute(
+                    update(NotificationOutbox)
+                    .where(NotificationOutbox.id.in_([entry_id for entry_id, _, _ in entries]))
+                    .values(next_retry_at=datetime.now(timezone.utc) + timedelta(seconds=CLAIM_LEASE))
+                )
+                await db.commit()
+            return entries
+
+    async def _record_outcomes(self, errors: Dict[int, Optional[BaseException]]):
+        """Mark delivered rows SENT and reschedule (or fail) the rest"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(NotificationOutbox).where(NotificationOutbox.id.in_(list(errors)))
+            )
+            now = datetime.now(timezone.utc)
+            for entry in result.scalars():
+                error = errors[entry.id]
+                if isinstance(error, asyncio.TimeoutError):
+                    error = f"send timed out after {SEND_TIMEOUT}s"
+
+                entry.attempts = (entry.attempts or 0) + 1
+                if error is None:
+                    entry.status = OutboxStatus.SENT
+                    entry.sent_at = now
+                    entry.last_error = None
+                    continue
+
+                entry.last_error = str(error)
+                if entry.attempts >= MAX_ATTEMPTS:
+                    entry.status = OutboxStatus.FAILED
+                    logger.error(f"Notification #{entry.id} failed permanently: {error}")
+                else:
+                    delay = min(BACKOFF_BASE * 2 ** (entry.attempts - 1), BACKOFF_MAX)
+                    entry.next_retry_at = now + timedelta(seconds=delay)
+                    logger.warning(f"Notification #{entry.id} failed (attempt {entry.attempts}), retrying in {delay}s: {error}")
+
+            await db.commit()
+
+
+# Global outbox worker
+notification_worker = NotificationWorker()
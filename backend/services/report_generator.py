@@ -2,11 +2,15 @@
 Report Generator Service
 Generates structured incident reports for police stations
 """
+import asyncio
+import io
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
-import json
 import os
+from aiofile import async_open
 from config import get_settings
+from services import _json
 
 settings = get_settings()
 
@@ -21,6 +25,22 @@ def generate_incident_report(
     Generate a structured incident report (JSON format).
     This is a PRELIMINARY INCIDENT INTIMATION, not an official FIR.
     """
+    incident_type = incident.incident_type
+    severity = incident.severity
+    status = incident.status
+    timestamp = incident.timestamp
+    created_at = incident.created_at
+    verified_by = incident.verified_by
+    verified_at = incident.verified_at
+    
+    if camera is None:
+        camera_id = address = zone = latitude = longitude = None
+    else:
+        camera_id = camera.camera_id
+        address = camera.location_address
+        zone = camera.zone
+        latitude = camera.latitude
+        longitude = camera.longitude
     
     report = {
         "document_type": "PRELIMINARY_INCIDENT_INTIMATION",
@@ -34,21 +54,21 @@ def generate_incident_report(
         
         "incident_details": {
             "incident_id": incident.incident_id,
-            "timestamp": incident.timestamp.isoformat() if incident.timestamp else None,
-            "created_at": incident.created_at.isoformat() if incident.created_at else None,
-            "incident_type": incident.incident_type.value if incident.incident_type else None,
-            "severity": incident.severity.value if incident.severity else None,
+            "timestamp": timestamp.isoformat() if timestamp else None,
+            "created_at": created_at.isoformat() if created_at else None,
+            "incident_type": incident_type.value if incident_type else None,
+            "severity": severity.value if severity else None,
             "confidence_score": incident.confidence_score,
-            "status": incident.status.value if incident.status else None
+            "status": status.value if status else None
         },
         
         "location": {
-            "camera_id": camera.camera_id if camera else None,
-            "address": camera.location_address if camera else None,
-            "zone": camera.zone if camera else None,
+            "camera_id": camera_id,
+            "address": address,
+            "zone": zone,
             "coordinates": {
-                "latitude": camera.latitude if camera else None,
-                "longitude": camera.longitude if camera else None
+                "latitude": latitude,
+                "longitude": longitude
             }
         },
         
@@ -65,9 +85,9 @@ def generate_incident_report(
         },
         
         "verification": {
-            "verified": incident.verified_by is not None,
-            "verified_by": incident.verified_by,
-            "verified_at": incident.verified_at.isoformat() if incident.verified_at else None
+            "verified": verified_by is not None,
+            "verified_by": verified_by,
+            "verified_at": verified_at.isoformat() if verified_at else None
         },
         
         "additional_information": {
@@ -89,70 +109,109 @@ def generate_incident_report(
     return report
 
 
-def generate_pdf_report(incident, camera, police_station=None, additional_notes=None) -> str:
+def serialize_report(report: dict) -> bytes:
+    """Compact UTF-8 JSON for a report (machine-parsed by recipients, so no indent)"""
+    return _json.dumps(report)
+
+
+@lru_cache(maxsize=1)
+def _pdf_styles() -> dict:
     """
-    Generate PDF version of the incident report.
-    Returns the file path to the generated PDF.
+    Read-only reportlab styles, built once on first use.
+    reportlab stays an import-on-demand dependency.
     """
     from reportlab.lib.pagesizes import A4
     from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.platypus import TableStyle
     from reportlab.lib import colors
     
+    styles = getSampleStyleSheet()
+    return {
+        "doc_kwargs": {"pagesize": A4},
+        "heading": styles['Heading2'],
+        "normal": styles['Normal'],
+        "title": ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=18,
+            textColor=colors.darkblue,
+            spaceAfter=12
+        ),
+        "disclaimer": ParagraphStyle(
+            'Disclaimer',
+            parent=styles['Normal'],
+            fontSize=9,
+            textColor=colors.red,
+            spaceAfter=12
+        ),
+        "footer": ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=8,
+            textColor=colors.grey
+        ),
+        "table": TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('PADDING', (0, 0), (-1, -1), 8),
+        ]),
+    }
+
+
+def _pdf_report_path(incident) -> str:
     os.makedirs(settings.REPORTS_DIR, exist_ok=True)
-    
     filename = f"incident_report_{incident.incident_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    filepath = os.path.join(settings.REPORTS_DIR, filename)
+    return os.path.join(settings.REPORTS_DIR, filename)
+
+
+def generate_pdf_report(incident, camera, police_station=None, additional_notes=None) -> str:
+    """
+    Generate PDF version of the incident report.
+    Returns the file path to the generated PDF.
+    """
+    filepath = _pdf_report_path(incident)
+    _render_pdf(filepath, incident, camera, police_station, additional_notes)
+    return filepath
+
+
+def _render_pdf(target, incident, camera, police_station=None, additional_notes=None):
+    """Lay out the report into target (a path or a binary file-like object)"""
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
     
-    doc = SimpleDocTemplate(filepath, pagesize=A4)
-    styles = getSampleStyleSheet()
+    styles = _pdf_styles()
+    
+    doc = SimpleDocTemplate(target, **styles["doc_kwargs"])
     story = []
     
     # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        textColor=colors.darkblue,
-        spaceAfter=12
-    )
-    story.append(Paragraph("PRELIMINARY INCIDENT INTIMATION REPORT", title_style))
+    story.append(Paragraph("PRELIMINARY INCIDENT INTIMATION REPORT", styles["title"]))
     story.append(Spacer(1, 0.25*inch))
     
     # Disclaimer
-    disclaimer_style = ParagraphStyle(
-        'Disclaimer',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=colors.red,
-        spaceAfter=12
-    )
     story.append(Paragraph(
         "<b>DISCLAIMER:</b> This is an AI-generated preliminary report for information purposes only. "
         "It does NOT constitute an official First Information Report (FIR).",
-        disclaimer_style
+        styles["disclaimer"]
     ))
     story.append(Spacer(1, 0.25*inch))
     
     # Incident Details Table
+    incident_type = incident.incident_type
+    severity = incident.severity
     incident_data = [
         ["Incident ID", incident.incident_id],
         ["Date/Time", str(incident.timestamp)],
-        ["Type", incident.incident_type.value if incident.incident_type else "N/A"],
-        ["Severity", incident.severity.value if incident.severity else "N/A"],
+        ["Type", incident_type.value if incident_type else "N/A"],
+        ["Severity", severity.value if severity else "N/A"],
         ["Confidence", f"{incident.confidence_score * 100:.1f}%"],
         ["Vehicles Involved", str(incident.vehicles_involved)],
         ["Pedestrian Involved", "Yes" if incident.pedestrian_involved else "No"],
     ]
     
     t = Table(incident_data, colWidths=[2*inch, 4*inch])
-    t.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('PADDING', (0, 0), (-1, -1), 8),
-    ]))
-    story.append(Paragraph("<b>Incident Details</b>", styles['Heading2']))
+    t.setStyle(styles["table"])
+    story.append(Paragraph("<b>Incident Details</b>", styles["heading"]))
     story.append(t)
     story.append(Spacer(1, 0.25*inch))
     
@@ -165,40 +224,44 @@ def generate_pdf_report(incident, camera, police_station=None, additional_notes=
             ["Coordinates", f"{camera.latitude}, {camera.longitude}"],
         ]
         t = Table(location_data, colWidths=[2*inch, 4*inch])
-        t.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('PADDING', (0, 0), (-1, -1), 8),
-        ]))
-        story.append(Paragraph("<b>Location</b>", styles['Heading2']))
+        t.setStyle(styles["table"])
+        story.append(Paragraph("<b>Location</b>", styles["heading"]))
         story.append(t)
         story.append(Spacer(1, 0.25*inch))
     
     # Description
     if incident.description:
-        story.append(Paragraph("<b>AI-Generated Description</b>", styles['Heading2']))
-        story.append(Paragraph(incident.description, styles['Normal']))
+        story.append(Paragraph("<b>AI-Generated Description</b>", styles["heading"]))
+        story.append(Paragraph(incident.description, styles["normal"]))
         story.append(Spacer(1, 0.25*inch))
     
     # Additional Notes
     if additional_notes:
-        story.append(Paragraph("<b>Additional Notes</b>", styles['Heading2']))
-        story.append(Paragraph(additional_notes, styles['Normal']))
+        story.append(Paragraph("<b>Additional Notes</b>", styles["heading"]))
+        story.append(Paragraph(additional_notes, styles["normal"]))
         story.append(Spacer(1, 0.25*inch))
     
     # Footer
     story.append(Spacer(1, 0.5*inch))
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.grey
-    )
     story.append(Paragraph(
         f"Report generated by Accident Incident Responder System on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-        footer_style
+        styles["footer"]
     ))
     
     doc.build(story)
+
+
+async def generate_pdf_report_async(incident, camera, police_station=None, additional_notes=None) -> str:
+    """
+    generate_pdf_report for async handlers: layout runs in a worker thread
+    into memory, then the file is written with native async file I/O.
+    """
+    filepath = _pdf_report_path(incident)
+    
+    buf = io.BytesIO()
+    await asyncio.to_thread(_render_pdf, buf, incident, camera, police_station, additional_notes)
+    
+    async with async_open(filepath, "wb") as out:
+        await out.write(buf.getvalue())
     
     return filepath
@@ -0,0 +1,145 @@
+"""
+Video Job Queue
+Runs uploaded-video ML processing in background workers, off the request path
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from database import AsyncSessionLocal
+from services.video_processor import process_videos_async
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUE_SIZE = 100
+VIDEO_WORKERS = 2
+VIDEO_BATCH_SIZE = 4  # queued jobs a worker takes at once
+MAX_TRACKED_JOBS = 1000
+
+PENDING_STATUSES = ("queued", "processing")
+
+
+def _job_result(file_id: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a process_video_async result like the old synchronous upload response"""
+    if result.get("detected"):
+        return {
+            "message": "🚨 INCIDENT DETECTED!",
+            "file_id": file_id,
+            "incident_created": True,
+            "incident_id": result.get("incident_id"),
+            "incident_db_id": result.get("incident_db_id"),
+            "incident_type": result.get("incident_type"),
+            "severity": result.get("severity"),
+            "confidence_score": result.get("confidence_score"),
+            "description": result.get("description"),
+            "status": "incident_created"
+        }
+    return {
+        "message": "Video analyzed - No incidents detected",
+        "file_id": file_id,
+        "incident_created": False,
+        "analysis_summary": result.get("analysis_summary"),
+        "status": "no_incident"
+    }
+
+
+class VideoJobQueue:
+    """
+    Bounded in-process job queue for uploaded videos.
+    Each worker opens its own DB session, so the upload request returns
+    as soon as the file is on disk.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._on_complete: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+
+    def start(self, on_complete: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None):
+        """Start the worker tasks (call from the app lifespan)"""
+        if self._workers:
+            return
+        self._on_complete = on_complete
+        self._queue = asyncio.Queue(maxsize=JOB_QUEUE_SIZE)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(VIDEO_WORKERS)]
+
+    async def stop(self):
+        """Cancel the workers; queued jobs are dropped"""
+        for task in self._workers:
+            task.cancel()
+        for task in self._workers:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+        self._queue = None
+
+    def enqueue(self, file_id: str, file_path: str, camera_id: int) -> Dict[str, Any]:
+        """Queue a video for processing. Raises asyncio.QueueFull when saturated."""
+        job = {"file_id": file_id, "file_path": file_path, "camera_id": camera_id, "status": "queued"}
+        self._queue.put_nowait(job)
+        self._track(file_id, job)
+        return job
+
+    def get(self, file_id: str) -> Optional[Dict[str, Any]]:
+        return self._jobs.get(file_id)
+
+    def _track(self, file_id: str, job: Dict[str, Any]):
+        self._jobs[file_id] = job
+        self._jobs.move_to_end(file_id)
+        while len(self._jobs) > MAX_TRACKED_JOBS:
+            self._jobs.popitem(last=False)
+
+    def _take_batch(self, first: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """first plus whatever else is already waiting, up to VIDEO_BATCH_SIZE"""
+        batch = [first]
+        while len(batch) < VIDEO_BATCH_SIZE:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _worker(self):
+        while True:
+            batch = self._take_batch(await self._queue.get())
+            for job in batch:
+                job["status"] = "processing"
+            try:
+                async with AsyncSessionLocal() as db:
+                    results = await process_videos_async(
+                        [(job["file_path"], job["camera_id"]) for job in batch], db
+                    )
+                done_jobs = [_job_result(job["file_id"], result) for job, result in zip(batch, results)]
+            except Exception as e:
+                logger.error(f"Error processing videos {[job['file_id'] for job in batch]}: {e}")
+                done_jobs = [
+                    {
+                        "message": "Video uploaded but processing failed",
+                        "file_id": job["file_id"],
+                        "file_path": job["file_path"],
+                        "camera_id": job["camera_id"],
+                        "status": "processing_error",
+                        "error": str(e)
+                    }
+                    for job in batch
+                ]
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+            for done in done_jobs:
+                file_id = done["file_id"]
+                self._track(file_id, done)
+                if self._on_complete:
+                    try:
+                        await self._on_complete(done)
+                    except Exception as e:
+                        logger.warning(f"Video job callback failed for {file_id}: {e}")
+
+
+# Global job queue
+video_jobs = VideoJobQueue()
@@ -3,11 +3,10 @@ Video Processor Service
 Processes uploaded videos and creates incident detections
 """
 import os
-import random
-import uuid
-from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 
 # Try to import CV2 for video processing
 try:
@@ -17,6 +16,70 @@ except ImportError:
     CV2_AVAILABLE = False
     print("Warning: OpenCV not available. Using simulation mode.")
 
+# Sampled frames are collected into one (N, H, W, 3) array per inference call
+FRAME_BATCH_SIZE = 8
+
+# Chance that a sampled frame yields a simulated detection
+BASE_DETECTION_PROBABILITY = 0.02
+
+# Description templates per incident type; "{v}" is the vehicle count
+_DESCRIPTIONS: Dict[str, Tuple[str, ...]] = {
+    "VEHICLE_COLLISION": (
+        "Vehicle collision detected with significant impact force.",
+        "Two vehicles involved in frontal collision at intersection.",
+        "Side-impact collision detected between vehicles."
+    ),
+    "MULTI_VEHICLE": (
+        "Multi-vehicle pile-up detected. Chain reaction collision.",
+        "Multiple vehicles involved in collision sequence.",
+        "Large-scale accident involving {v} vehicles detected."
+    ),
+    "ROLLOVER": (
+        "Vehicle rollover detected. Single vehicle incident.",
+        "Vehicle overturned after losing control.",
+        "Rollover accident detected on roadway."
+    ),
+    "PEDESTRIAN_IMPACT": (
+        "CRITICAL: Pedestrian impact detected. Immediate response required.",
+        "Vehicle-pedestrian collision detected at crossing.",
+        "Pedestrian struck by vehicle. High severity incident."
+    ),
+}
+_DEFAULT_DESCS: Tuple[str, ...] = ("Incident detected.",)
+
+
+# Shared generator for the simulation; uniforms are drawn in one call per detection
+_rng = np.random.default_rng()
+
+
+def _reseed_rng():
+    # Forked analysis workers would otherwise share the parent's stream
+    global _rng
+    _rng = np.random.default_rng()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reseed_rng)
+
+
+def _pick(options, u: float):
+    """Choose from a sequence with a pre-drawn uniform in [0, 1)"""
+    return options[int(u * len(options))]
+
+
+def _open_capture(video_path: str):
+    """
+    Open a video with hardware-accelerated decode (NVDEC/VAAPI/D3D11 via FFmpeg)
+    when OpenCV supports it, falling back to the default software decoder.
+    """
+    hw_accel = getattr(cv2, "CAP_PROP_HW_ACCELERATION", None)
+    if hw_accel is not None:
+        cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [hw_accel, cv2.VIDEO_ACCELERATION_ANY])
+        if cap.isOpened():
+            return cap
+        cap.release()
+    return cv2.VideoCapture(video_path)
+
 
 class VideoProcessor:
     """
@@ -56,7 +119,7 @@ class VideoProcessor:
     def _analyze_with_cv2(self, video_path: str, camera_id: int) -> Dict[str, Any]:
         """Analyze video using OpenCV (simulated ML detection)"""
         try:
-            cap = cv2.VideoCapture(video_path)
+            cap = _open_capture(video_path)
             
             if not cap.isOpened():
                 return {"error": "Could not open video", "detected": False}
@@ -68,33 +131,63 @@ class VideoProcessor:
             # Sample frames for analysis
             frame_count = 0
             analyzed_frames = 0
-            detections = []
+            # Hits are kept as parallel arrays (frame number, confidence) per batch
+            hit_frames = []
+            hit_confidences = []
             
             sample_interval = max(1, fps // self.fps_sample)
             
+            batch = None
+            batch_frame_numbers = []
+            
             while True:
-                ret, frame = cap.read()
-                if not ret:
+                # grab() only demuxes; frames we don't sample are never decoded
+                if not cap.grab():
                     break
                 
                 frame_count += 1
                 
                 # Sample every Nth frame
-                if frame_count % sample_interval == 0:
-                    analyzed_frames += 1
-                    
-                    # Simulate detection on this frame
-                    # In production, this would call YOLOv8
-                    detection = self._simulate_frame_detection(frame, frame_count, fps)
-                    if detection:
-                        detections.append(detection)
+                if frame_count % sample_interval != 0:
+                    continue
+                
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                
+                analyzed_frames += 1
+                
+                if batch is None:
+                    batch = np.empty((FRAME_BATCH_SIZE, *frame.shape), dtype=np.uint8)
+                batch[len(batch_frame_numbers)] = frame
+                batch_frame_numbers.append(frame_count)
+                
+                if len(batch_frame_numbers) == FRAME_BATCH_SIZE:
+                    frames_hit, confidences = self._simulate_batch_detection(batch, batch_frame_numbers)
+                    hit_frames.append(frames_hit)
+                    hit_confidences.append(confidences)
+                    batch_frame_numbers = []
+            
+            # Flush the partial batch at EOF
+            if batch_frame_numbers:
+                frames_hit, confidences = self._simulate_batch_detection(
+                    batch[:len(batch_frame_numbers)], batch_frame_numbers
+                )
+                hit_frames.append(frames_hit)
+                hit_confidences.append(confidences)
             
             cap.release()
             
+            hit_frames = np.concatenate(hit_frames) if hit_frames else np.empty(0, dtype=np.int64)
+            hit_confidences = np.concatenate(hit_confidences) if hit_confidences else np.empty(0)
+            
             # Process detections
-            if detections:
-                # Take the highest confidence detection
-                best_detection = max(detections, key=lambda x: x['confidence'])
+            if hit_frames.size:
+                # Take the highest confidence detection; only the winner becomes a dict
+                best = int(np.argmax(hit_confidences))
+                best_detection = self._simulate_frame_detection(
+                    int(hit_frames[best]), fps, float(hit_confidences[best])
+                )
                 
                 return {
                     "detected": True,
@@ -110,7 +203,7 @@ class VideoProcessor:
                     "analysis_summary": {
                         "total_frames": total_frames,
                         "analyzed_frames": analyzed_frames,
-                        "detections_found": len(detections),
+                        "detections_found": int(hit_frames.size),
                         "duration_seconds": duration
                     }
                 }
@@ -128,58 +221,62 @@ class VideoProcessor:
         except Exception as e:
             return {"error": str(e), "detected": False}
     
-    def _simulate_frame_detection(self, frame, frame_num: int, fps: int) -> Optional[Dict]:
+    def _simulate_batch_detection(self, frames: np.ndarray, frame_numbers: List[int]) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Simulate detection on a frame.
-        In production, this would run YOLOv8 inference.
+        Simulate detection on a batch of frames shaped (N, H, W, 3).
+        In production, this would be a single batched YOLOv8 call, e.g.
+        model(frames, half=True).
+        Returns (frame numbers, confidences) of the frames with a hit.
         """
-        # For demo: detect "accident" around the middle of the video
-        # with some randomness to make it realistic
+        n = len(frame_numbers)
+        hits = _rng.random(n) < BASE_DETECTION_PROBABILITY
+        confidences = np.round(_rng.uniform(0.85, 0.98, n), 2)
+        return np.asarray(frame_numbers)[hits], confidences[hits]
+    
+    def _simulate_frame_detection(self, frame_num: int, fps: int, confidence: float) -> Dict:
+        """Random detection attributes for a frame that triggered a hit"""
+        # Generate a detection: type, severity, vehicle count
+        u = _rng.random(3)
+        incident_type = _pick(self.incident_types, u[0])
         
-        # Probability of detection increases in middle of video
-        base_probability = 0.02  # 2% base chance per sampled frame
+        # Severity based on incident type
+        if incident_type == "PEDESTRIAN_IMPACT":
+            severity = _pick(("HIGH", "CRITICAL"), u[1])
+            pedestrian = True
+        elif incident_type == "MULTI_VEHICLE":
+            severity = _pick(("HIGH", "CRITICAL"), u[1])
+            pedestrian = False
+        elif incident_type == "ROLLOVER":
+            severity = _pick(("MEDIUM", "HIGH"), u[1])
+            pedestrian = False
+        else:
+            severity = _pick(("MEDIUM", "HIGH", "CRITICAL"), u[1])
+            pedestrian = False
         
-        if random.random() < base_probability:
-            # Generate a detection
-            incident_type = random.choice(self.incident_types)
-            
-            # Severity based on incident type
-            if incident_type == "PEDESTRIAN_IMPACT":
-                severity = random.choice(["HIGH", "CRITICAL"])
-                pedestrian = True
-            elif incident_type == "MULTI_VEHICLE":
-                severity = random.choice(["HIGH", "CRITICAL"])
-                pedestrian = False
-            elif incident_type == "ROLLOVER":
-                severity = random.choice(["MEDIUM", "HIGH"])
-                pedestrian = False
-            else:
-                severity = random.choice(["MEDIUM", "HIGH", "CRITICAL"])
-                pedestrian = False
-            
-            vehicles = 2 if incident_type == "VEHICLE_COLLISION" else (
-                random.randint(3, 5) if incident_type == "MULTI_VEHICLE" else 1
-            )
-            
-            return {
-                "type": incident_type,
-                "severity": severity,
-                "confidence": round(random.uniform(0.85, 0.98), 2),
-                "vehicles": vehicles,
-                "pedestrian": pedestrian,
-                "timestamp": frame_num / fps,
-                "frame": frame_num
-            }
+        vehicles = 2 if incident_type == "VEHICLE_COLLISION" else (
+            3 + int(u[2] * 3) if incident_type == "MULTI_VEHICLE" else 1
+        )
         
-        return None
+        return {
+            "type": incident_type,
+            "severity": severity,
+            "confidence": confidence,
+            "vehicles": vehicles,
+            "pedestrian": pedestrian,
+            "timestamp": frame_num / fps,
+            "frame": frame_num
+        }
     
     def _simulate_detection(self, video_path: str, camera_id: int) -> Dict[str, Any]:
         """
         Simulate detection without OpenCV.
         Always detects an incident for demo purposes.
         """
+        # One draw: type, severity, vehicles, pedestrian, confidence, timestamp
+        u = _rng.random(6)
+        
         # Randomly select incident type
-        incident_type = random.choice(self.incident_types)
+        incident_type = _pick(self.incident_types, u[0])
         
         # Determine severity and other properties
         if incident_type == "PEDESTRIAN_IMPACT":
@@ -187,19 +284,19 @@ class VideoProcessor:
             vehicles = 1
             pedestrian = True
         elif incident_type == "MULTI_VEHICLE":
-            severity = random.choice(["HIGH", "CRITICAL"])
-            vehicles = random.randint(3, 5)
+            severity = _pick(("HIGH", "CRITICAL"), u[1])
+            vehicles = 3 + int(u[2] * 3)
             pedestrian = False
         elif incident_type == "ROLLOVER":
             severity = "HIGH"
             vehicles = 1
             pedestrian = False
         else:  # VEHICLE_COLLISION
-            severity = random.choice(["MEDIUM", "HIGH", "CRITICAL"])
+            severity = _pick(("MEDIUM", "HIGH", "CRITICAL"), u[1])
             vehicles = 2
-            pedestrian = random.random() < 0.1  # 10% chance
+            pedestrian = bool(u[3] < 0.1)  # 10% chance
         
-        confidence = round(random.uniform(0.87, 0.96), 2)
+        confidence = round(0.87 + float(u[4]) * (0.96 - 0.87), 2)
         
         detection = {
             "type": incident_type,
@@ -207,7 +304,7 @@ class VideoProcessor:
             "confidence": confidence,
             "vehicles": vehicles,
             "pedestrian": pedestrian,
-            "timestamp": random.uniform(1.0, 5.0)
+            "timestamp": 1.0 + float(u[5]) * 4.0
         }
         
         return {
@@ -229,84 +326,122 @@ class VideoProcessor:
     
     def _generate_description(self, detection: Dict) -> str:
         """Generate AI-style description of the incident"""
-        descriptions = {
-            "VEHICLE_COLLISION": [
-                "Vehicle collision detected with significant impact force.",
-                "Two vehicles involved in frontal collision at intersection.",
-                "Side-impact collision detected between vehicles."
-            ],
-            "MULTI_VEHICLE": [
-                "Multi-vehicle pile-up detected. Chain reaction collision.",
-                "Multiple vehicles involved in collision sequence.",
-                "Large-scale accident involving {v} vehicles detected."
-            ],
-            "ROLLOVER": [
-                "Vehicle rollover detected. Single vehicle incident.",
-                "Vehicle overturned after losing control.",
-                "Rollover accident detected on roadway."
-            ],
-            "PEDESTRIAN_IMPACT": [
-                "CRITICAL: Pedestrian impact detected. Immediate response required.",
-                "Vehicle-pedestrian collision detected at crossing.",
-                "Pedestrian struck by vehicle. High severity incident."
-            ]
-        }
-        
-        desc = random.choice(descriptions.get(detection['type'], ["Incident detected."]))
-        desc = desc.replace("{v}", str(detection.get('vehicles', 2)))
+        desc = _pick(_DESCRIPTIONS.get(detection['type'], _DEFAULT_DESCS), _rng.random())
+        if "{v}" in desc:
+            desc = desc.format(v=detection.get('vehicles', 2))
         
         return f"{desc} Confidence: {detection['confidence']*100:.0f}%. Severity level: {detection['severity']}."
 
 
+# Frame analysis is CPU-bound; run it in worker processes, outside the GIL
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _executor
+
+
+def shutdown_executor():
+    """Stop the analysis worker processes (call on app shutdown)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _run_analyze(video_path: str, camera_id: int) -> Dict[str, Any]:
+    """Picklable entry point executed in a worker process"""
+    return VideoProcessor().analyze_video(video_path, camera_id)
+
+
+def _incident_row(result: Dict[str, Any], video_path: str, camera_id: int) -> Dict[str, Any]:
+    """Column values for an incident created from a positive analysis"""
+    from models import IncidentType, SeverityLevel, IncidentStatus
+    
+    return {
+        "camera_id": camera_id,
+        "incident_type": IncidentType.__members__.get(result['incident_type'], IncidentType.VEHICLE_COLLISION),
+        "severity": SeverityLevel.__members__.get(result['severity'], SeverityLevel.MEDIUM),
+        "confidence_score": result['confidence_score'],
+        "vehicles_involved": result['vehicles_involved'],
+        "pedestrian_involved": result['pedestrian_involved'],
+        "description": result['description'],
+        "video_clip_path": video_path,
+        "status": IncidentStatus.DETECTED
+    }
+
+
 # Background task for processing
 async def process_video_async(video_path: str, camera_id: int, db_session) -> Dict[str, Any]:
     """
     Async wrapper for video processing.
     Returns detection results and creates incident if detected.
     """
-    from models import Incident, IncidentType, SeverityLevel, IncidentStatus
+    from sqlalchemy import insert
+    from models import Incident
     
-    processor = VideoProcessor()
-    result = processor.analyze_video(video_path, camera_id)
+    # DB writes stay here; only the analysis crosses the process boundary
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(_get_executor(), _run_analyze, video_path, camera_id)
     
     if result.get("detected"):
-        # Create incident in database
-        incident_id = f"INC-{datetime.now().year}-{uuid.uuid4().hex[:6].upper()}"
-        
-        # Map string to enum
-        incident_type_map = {
-            "VEHICLE_COLLISION": IncidentType.VEHICLE_COLLISION,
-            "MULTI_VEHICLE": IncidentType.MULTI_VEHICLE,
-            "ROLLOVER": IncidentType.ROLLOVER,
-            "PEDESTRIAN_IMPACT": IncidentType.PEDESTRIAN_IMPACT
-        }
-        
-        severity_map = {
-            "LOW": SeverityLevel.LOW,
-            "MEDIUM": SeverityLevel.MEDIUM,
-            "HIGH": SeverityLevel.HIGH,
-            "CRITICAL": SeverityLevel.CRITICAL
-        }
-        
-        new_incident = Incident(
-            incident_id=incident_id,
-            camera_id=camera_id,
-            incident_type=incident_type_map.get(result['incident_type'], IncidentType.VEHICLE_COLLISION),
-            severity=severity_map.get(result['severity'], SeverityLevel.MEDIUM),
-            confidence_score=result['confidence_score'],
-            vehicles_involved=result['vehicles_involved'],
-            pedestrian_involved=result['pedestrian_involved'],
-            description=result['description'],
-            video_clip_path=video_path,
-            status=IncidentStatus.DETECTED
+        # Create incident in database (incident_id is generated by the DB)
+        inserted = await db_session.execute(
+            insert(Incident)
+            .values(_incident_row(result, video_path, camera_id))
+            .returning(Incident.id, Incident.incident_id)
         )
-        
-        db_session.add(new_incident)
-        db_session.commit()
-        db_session.refresh(new_incident)
+        new_incident = inserted.one()
+        await db_session.commit()
         
         result['incident_created'] = True
         result['incident_db_id'] = new_incident.id
-        result['incident_id'] = incident_id
+        result['incident_id'] = new_incident.incident_id
     
     return result
+
+
+async def process_videos_async(jobs: List[Tuple[str, int]], db_session) -> List[Dict[str, Any]]:
+    """
+    Batch form of process_video_async for (video_path, camera_id) pairs.
+    Analyses run concurrently in the worker processes; every detected incident
+    is then written with one multi-row INSERT and a single commit.
+    Results are returned in job order.
+    """
+    from sqlalchemy import insert
+    from models import Incident
+    
+    if not jobs:
+        return []
+    
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    outcomes = await asyncio.gather(
+        *(loop.run_in_executor(executor, _run_analyze, path, cam) for path, cam in jobs),
+        return_exceptions=True
+    )
+    
+    results = [
+        {"error": str(o), "detected": False} if isinstance(o, BaseException) else o
+        for o in outcomes
+    ]
+    
+    detected = [i for i, r in enumerate(results) if r.get("detected")]
+    if detected:
+        rows = [_incident_row(results[i], *jobs[i]) for i in detected]
+        inserted = await db_session.execute(
+            insert(Incident).returning(Incident.id, Incident.incident_id, sort_by_parameter_order=True),
+            rows
+        )
+        created = inserted.all()
+        await db_session.commit()
+        
+        for i, row in zip(detected, created):
+            results[i]['incident_created'] = True
+            results[i]['incident_db_id'] = row.id
+            results[i]['incident_id'] = row.incident_id
+    
+    return results
@@ -0,0 +1,11 @@
+"""
+Test setup: backend modules import each other flat (from database import ...),
+and the settings are pointed at a throwaway SQLite file before they load.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
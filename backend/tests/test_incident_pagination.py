@@ -0,0 +1,44 @@
+"""
+Keyset pagination for GET /incidents/
+"""
+import asyncio
+
+from sqlalchemy import text
+
+from database import AsyncSessionLocal, engine, init_db
+from routers.incidents import get_incidents
+
+# SQLite's CURRENT_TIMESTAMP format, as written by the created_at server default
+SAME_SECOND = "2024-01-01 12:00:00"
+
+
+def _insert_same_second(count: int):
+    init_db()
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM incidents"))
+        conn.execute(
+            text("INSERT INTO incidents (incident_id, created_at, timestamp) VALUES (:iid, :ts, :ts)"),
+            [{"iid": f"INC-TEST-{i}", "ts": SAME_SECOND} for i in range(count)]
+        )
+        return [row[0] for row in conn.execute(text("SELECT id FROM incidents ORDER BY id DESC"))]
+
+
+async def _read_all_pages(limit: int, max_pages: int):
+    ids = []
+    cursor = None
+    async with AsyncSessionLocal() as db:
+        for _ in range(max_pages):
+            page = await get_incidents(status=None, severity=None, limit=limit, cursor=cursor, db=db)
+            ids.extend(row.id for row in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return ids
+    raise AssertionError(f"Pagination did not finish within {max_pages} pages: {ids}")
+
+
+def test_pages_through_rows_created_in_the_same_second():
+    expected = _insert_same_second(7)
+    
+    ids = asyncio.run(_read_all_pages(limit=3, max_pages=10))
+    
+    assert ids == expected
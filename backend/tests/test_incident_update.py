@@ -0,0 +1,40 @@
+"""
+PATCH /incidents/{id}
+"""
+import asyncio
+
+from sqlalchemy import text
+
+from database import AsyncSessionLocal, engine, init_db
+from routers.incidents import update_incident
+from schemas import IncidentStatus, IncidentUpdate
+
+
+def _insert_incident() -> int:
+    init_db()
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM incidents"))
+        conn.execute(
+            text("INSERT INTO incidents (incident_id, status, description) VALUES ('INC-TEST-PATCH', 'DETECTED', 'before')")
+        )
+        return conn.execute(text("SELECT id FROM incidents")).scalar_one()
+
+
+async def _patch(incident_id: int, changes: IncidentUpdate):
+    async with AsyncSessionLocal() as db:
+        return await update_incident(incident_id=incident_id, changes=changes, db=db)
+
+
+def test_patch_verifies_incident():
+    incident_id = _insert_incident()
+    
+    incident = asyncio.run(_patch(
+        incident_id,
+        IncidentUpdate(status=IncidentStatus.VERIFIED, verified_by="operator-1", description="after")
+    ))
+    
+    assert incident.id == incident_id
+    assert incident.status == IncidentStatus.VERIFIED
+    assert incident.verified_by == "operator-1"
+    assert incident.verified_at is not None
+    assert incident.description == "after"
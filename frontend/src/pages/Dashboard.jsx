@@ -128,7 +128,8 @@ function Dashboard() {
         if (file) {
             setLoading(true);
             try {
-                const result = await api.uploadVideo(1, file);
+                const upload = await api.uploadVideo(1, file);
+                const result = await api.waitForVideoJob(upload.file_id);
 
                 if (result.incident_created) {
                     alert(`🚨 INCIDENT DETECTED!\n\nType: ${result.incident_type}\nSeverity: ${result.severity}\nConfidence: ${(result.confidence_score * 100).toFixed(0)}%\n\nIncident ID: ${result.incident_id}`);
@@ -32,11 +32,13 @@ class ApiService {
     }
 
     // Incidents
-    async getIncidents(status = null, severity = null) {
+    async getIncidents(status = null, severity = null, cursor = null) {
+        // Returns { items, next_cursor }; pass next_cursor back for the next page
         let url = '/incidents/';
         const params = new URLSearchParams();
         if (status) params.append('status', status);
         if (severity) params.append('severity', severity);
+        if (cursor) params.append('cursor', cursor);
         if (params.toString()) url += `?${params.toString()}`;
         return this.request(url);
     }
@@ -86,6 +88,21 @@ class ApiService {
         return await response.json();
     }
 
+    async getVideoJob(fileId) {
+        return this.request(`/incidents/job/${fileId}`);
+    }
+
+    async waitForVideoJob(fileId, intervalMs = 1000) {
+        // Uploads are processed in the background; poll until the job settles
+        for (;;) {
+            const job = await this.getVideoJob(fileId);
+            if (job.status !== 'queued' && job.status !== 'processing') {
+                return job;
+            }
+            await new Promise(resolve => setTimeout(resolve, intervalMs));
+        }
+    }
+
     // Cameras
     async getCameras() {
         return this.request('/cameras/');
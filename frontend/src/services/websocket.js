@@ -21,6 +21,7 @@ class WebSocketService {
 
         try {
             this.ws = new WebSocket(wsUrl);
+            this.ws.binaryType = 'arraybuffer';
 
             this.ws.onopen = () => {
                 console.log('WebSocket connected');
@@ -31,7 +32,9 @@ class WebSocketService {
 
             this.ws.onmessage = (event) => {
                 try {
-                    const message = JSON.parse(event.data);
+                    const message = typeof event.data === 'string'
+                        ? JSON.parse(event.data)
+                        : this.decodeBinaryFrame(event.data);
                     this.handleMessage(message);
                 } catch (e) {
                     console.error('Failed to parse WebSocket message:', e);
@@ -52,8 +55,26 @@ class WebSocketService {
         }
     }
 
+    decodeBinaryFrame(buffer) {
+        // [4-byte LE header length][JSON header][float32 bbox coordinates]
+        const headerLength = new DataView(buffer).getUint32(0, true);
+        const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+        const coords = new Float32Array(buffer.slice(4 + headerLength));
+        const labels = header.data.box_labels || [];
+        header.data.bounding_boxes = labels.map((label, i) => ({
+            ...label,
+            bbox: Array.from(coords.subarray(i * 4, i * 4 + 4))
+        }));
+        delete header.data.box_labels;
+        return header;
+    }
+
     handleMessage(message) {
         switch (message.type) {
+            case 'batch':
+                // Server coalesces queued events into one frame
+                message.events.forEach(event => this.handleMessage(event));
+                break;
             case 'new_incident':
                 this.emit('new_incident', message.data);
                 break;
@@ -63,6 +84,10 @@ class WebSocketService {
             case 'alert':
                 this.emit('alert', message);
                 break;
+            case 'ping':
+                // Server heartbeat - answer so the connection isn't reaped
+                this.ws.send(JSON.stringify({ type: 'pong' }));
+                break;
             case 'pong':
                 // Heartbeat response
                 break;
@@ -0,0 +1,32 @@
+"""
+Kernel Warmup
+Compiles the Numba kernels ahead of the first video, optionally at import
+"""
+import os
+import logging
+import time
+
+import detector
+import severity_scorer
+
+logger = logging.getLogger(__name__)
+
+# Set NUMBA_PREWARM=1 to compile when the pipeline module is imported
+PREWARM_ENV = "NUMBA_PREWARM"
+
+
+def warmup():
+    """
+    Compile the severity and classification kernels on dummy input. They are
+    @njit(cache=True), so after the first run this only loads the on-disk cache.
+    """
+    start = time.perf_counter()
+    severity_scorer.warmup()
+    detector.warmup_kernels()
+    logger.info("Numba kernels ready in %.2fs", time.perf_counter() - start)
+
+
+def prewarm_from_env():
+    """warmup() if NUMBA_PREWARM=1"""
+    if os.environ.get(PREWARM_ENV) == "1":
+        warmup()
@@ -2,25 +2,67 @@
 Accident Detection using YOLOv8
 Detects: vehicles, collisions, pedestrians, rollovers
 """
+import os
 import cv2
 import numpy as np
 from ultralytics import YOLO
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Sequence
 from dataclasses import dataclass
-from enum import Enum
+from enum import IntEnum
 import logging
 
+# Try to import Numba for the compiled classifier
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-class IncidentType(str, Enum):
-    VEHICLE_COLLISION = "VEHICLE_COLLISION"
-    ROLLOVER = "ROLLOVER"
-    MULTI_VEHICLE = "MULTI_VEHICLE"
-    PEDESTRIAN_IMPACT = "PEDESTRIAN_IMPACT"
-    FIRE_SMOKE = "FIRE_SMOKE"
-    OTHER = "OTHER"
+class IncidentType(IntEnum):
+    VEHICLE_COLLISION = 1
+    ROLLOVER = 2
+    MULTI_VEHICLE = 3
+    PEDESTRIAN_IMPACT = 4
+    FIRE_SMOKE = 5
+    OTHER = 6
+
+
+# API names for IncidentType (the backend's incident_type strings)
+INCIDENT_TYPE_NAMES = {t: t.name for t in IncidentType}
+
+
+def box_iou(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """
+    Pairwise IoU between (N, 4) and (M, 4) xyxy box arrays.
+    Returns an (N, M) matrix.
+    """
+    inter_ul = np.maximum(boxes1[:, None, :2], boxes2[None, :, :2])
+    inter_lr = np.minimum(boxes1[:, None, 2:], boxes2[None, :, 2:])
+    inter = np.clip(inter_lr - inter_ul, 0, None).prod(-1)
+    
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    union = area1[:, None] + area2[None, :] - inter
+    
+    return inter / np.maximum(union, 1)
+
+
+def _iou_scalar(b1: Tuple, b2: Tuple) -> float:
+    """IoU of two xyxy boxes in plain Python (cheaper than box_iou for a few pairs)"""
+    ix1 = max(b1[0], b2[0])
+    iy1 = max(b1[1], b2[1])
+    ix2 = min(b1[2], b2[2])
+    iy2 = min(b1[3], b2[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    
+    a1 = (b1[2] - b1[0]) * (b1[3] - b1[1])
+    a2 = (b2[2] - b2[0]) * (b2[3] - b2[1])
+    
+    return inter / max(a1 + a2 - inter, 1)
 
 
 @dataclass
@@ -33,19 +75,114 @@ class DetectionResult:
     center: Tuple[int, int]
 
 
+class DetectionArray:
+    """
+    One frame's detections of a kind, stored column-wise:
+    bbox (N, 4) int32 xyxy, confidence (N,) float32, class_id (N,) int32.
+    Indexing or iterating builds DetectionResult objects on demand.
+    """
+    __slots__ = ("bbox", "confidence", "class_id", "names")
+    
+    def __init__(self, bbox: np.ndarray, confidence: np.ndarray, class_id: np.ndarray, names: Sequence[str]):
+        self.bbox = bbox
+        self.confidence = confidence
+        self.class_id = class_id
+        self.names = names
+    
+    def __len__(self) -> int:
+        return len(self.confidence)
+    
+    def __getitem__(self, i: int) -> DetectionResult:
+        x1, y1, x2, y2 = self.bbox[i].tolist()
+        class_id = int(self.class_id[i])
+        return DetectionResult(
+            class_id=class_id,
+            class_name=self.names[class_id],
+            confidence=float(self.confidence[i]),
+            bbox=(x1, y1, x2, y2),
+            center=((x1 + x2) // 2, (y1 + y2) // 2)
+        )
+    
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
 @dataclass
 class AccidentDetection:
     """Accident detection result"""
     detected: bool
     incident_type: IncidentType
     confidence: float
-    vehicles: List[DetectionResult]
-    pedestrians: List[DetectionResult]
+    vehicles: DetectionArray
+    pedestrians: DetectionArray
     bounding_boxes: List[Dict]
     frame_id: int
     description: str
 
 
+if NUMBA_AVAILABLE:
+    _PEDESTRIAN_IMPACT = int(IncidentType.PEDESTRIAN_IMPACT)
+    _MULTI_VEHICLE = int(IncidentType.MULTI_VEHICLE)
+    _VEHICLE_COLLISION = int(IncidentType.VEHICLE_COLLISION)
+    _ROLLOVER = int(IncidentType.ROLLOVER)
+    _OTHER = int(IncidentType.OTHER)
+    
+    @njit(cache=True)
+    def _classify_jit(veh_boxes, veh_conf, ped_boxes, ped_conf, iou_thresh, roll_lo, roll_hi, proximity):
+        """
+        Compiled equivalent of AccidentDetector._classify_incident for a frame
+        with at least one vehicle. Returns (incident code, confidence, meta) where
+        meta is the overlap count, IoU or aspect ratio for the matching rule.
+        """
+        n_v = veh_boxes.shape[0]
+        n_p = ped_boxes.shape[0]
+        
+        # Vehicle-pedestrian proximity
+        for p in range(n_p):
+            pcx = (ped_boxes[p, 0] + ped_boxes[p, 2]) // 2
+            pcy = (ped_boxes[p, 1] + ped_boxes[p, 3]) // 2
+            pw = ped_boxes[p, 2] - ped_boxes[p, 0]
+            for v in range(n_v):
+                dx = pcx - (veh_boxes[v, 0] + veh_boxes[v, 2]) // 2
+                dy = pcy - (veh_boxes[v, 1] + veh_boxes[v, 3]) // 2
+                avg_size = (pw + veh_boxes[v, 2] - veh_boxes[v, 0]) / 2
+                if np.sqrt(dx * dx + dy * dy) < avg_size + proximity:
+                    return _PEDESTRIAN_IMPACT, float(max(ped_conf[p], veh_conf[v])), 0.0
+        
+        # Pairwise IoU: pile-up count and first colliding pair in one pass
+        overlapping = 0
+        hit_iou = 0.0
+        hit_conf = -1.0
+        for i in range(n_v):
+            a_i = (veh_boxes[i, 2] - veh_boxes[i, 0]) * (veh_boxes[i, 3] - veh_boxes[i, 1])
+            for j in range(i + 1, n_v):
+                iw = min(veh_boxes[i, 2], veh_boxes[j, 2]) - max(veh_boxes[i, 0], veh_boxes[j, 0])
+                ih = min(veh_boxes[i, 3], veh_boxes[j, 3]) - max(veh_boxes[i, 1], veh_boxes[j, 1])
+                if iw <= 0 or ih <= 0:
+                    continue
+                inter = iw * ih
+                a_j = (veh_boxes[j, 2] - veh_boxes[j, 0]) * (veh_boxes[j, 3] - veh_boxes[j, 1])
+                iou = inter / max(a_i + a_j - inter, 1)
+                if iou > 0.1:
+                    overlapping += 1
+                if hit_conf < 0 and iou > iou_thresh:
+                    hit_iou = iou
+                    hit_conf = float(max(veh_conf[i], veh_conf[j]))
+        
+        if n_v >= 3 and overlapping >= 2:
+            return _MULTI_VEHICLE, float(veh_conf.mean()), float(overlapping)
+        if hit_conf >= 0:
+            return _VEHICLE_COLLISION, hit_conf, hit_iou
+        
+        # Rollover (unusual aspect ratio)
+        for v in range(n_v):
+            aspect = (veh_boxes[v, 2] - veh_boxes[v, 0]) / max(veh_boxes[v, 3] - veh_boxes[v, 1], 1)
+            if aspect < roll_lo or aspect > roll_hi:
+                return _ROLLOVER, float(veh_conf[v]), aspect
+        
+        return _OTHER, 0.0, 0.0
+
+
 class AccidentDetector:
     """
     YOLOv8-based accident detector.
@@ -67,29 +204,172 @@ class AccidentDetector:
     COLLISION_IOU_THRESHOLD = 0.3
     ROLLOVER_ASPECT_RATIO = 0.7
     
-    def __init__(self, model_path: str = "yolov8n.pt", confidence_threshold: float = 0.5):
+    # Below this many vehicles, pairwise IoU is cheaper in plain Python
+    VECTORIZED_IOU_MIN_VEHICLES = 4
+    
+    # Inference input size and number of warmup passes after loading
+    IMG_SIZE = 640
+    LETTERBOX_FILL = 114  # grey used by Ultralytics to pad letterboxed input
+    WARMUP_ITERATIONS = 3
+    
+    def __init__(
+        self,
+        model_path: str = "yolov8n.pt",
+        confidence_threshold: float = 0.5,
+        batch_size: int = 8,
+        use_tensorrt: bool = True
+    ):
         """
         Initialize the detector.
         
         Args:
             model_path: Path to YOLO model (default: yolov8n.pt - nano model)
             confidence_threshold: Minimum confidence for detections
+            batch_size: Largest frame batch passed to the model (sizes the TensorRT engine)
+            use_tensorrt: Export .pt weights to a cached FP16 TensorRT engine when CUDA is available
         """
         self.model_path = model_path
         self.confidence_threshold = confidence_threshold
+        self.batch_size = batch_size
+        self.use_tensorrt = use_tensorrt
         self.model = None
+        self._names: Tuple[str, ...] = ()
+        
+        # Scratch frame and label prefixes reused by draw_detections
+        self._annot_buf: Optional[np.ndarray] = None
+        self._label_prefixes: Dict[int, str] = {}
+        self._vehicle_lut = np.zeros(0, dtype=bool)
+        
+        # Pre-resized input batch (host staging + device tensor), CUDA only
+        self._rsz_buf: Optional[np.ndarray] = None
+        self._pinned = None
+        self._input = None
+        self._copy_stream = None
+        self._copy_done = None
+        
         self._load_model()
+        self._init_input_buffers()
     
     def _load_model(self):
-        """Load YOLO model"""
+        """Load YOLO model, preferring a TensorRT engine built from the .pt weights"""
         try:
-            logger.info(f"Loading YOLO model: {self.model_path}")
-            self.model = YOLO(self.model_path)
+            model_path = self.model_path
+            if self.use_tensorrt and model_path.endswith(".pt"):
+                model_path = self._tensorrt_engine(model_path) or model_path
+            
+            logger.info(f"Loading YOLO model: {model_path}")
+            self.model = YOLO(model_path, task="detect")
+            
+            # Class names indexed by id, so lookups are tuple indexing rather than dict hashing
+            names = self.model.names
+            self._names = tuple(names.get(i, str(i)) for i in range(max(names) + 1))
+            
+            # Vehicle membership by class id: one gather per frame instead of a set test per box
+            self._vehicle_lut = np.zeros(max(len(self._names), max(self.VEHICLE_CLASSES) + 1), dtype=bool)
+            self._vehicle_lut[list(self.VEHICLE_CLASSES)] = True
+            
+            self._warmup()
             logger.info("Model loaded successfully")
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
             raise
     
+    def _tensorrt_engine(self, pt_path: str) -> Optional[str]:
+        """
+        Path to an FP16 TensorRT engine for pt_path, exporting it next to the
+        weights on first use. Returns None when CUDA/TensorRT is unavailable.
+        """
+        engine_path = os.path.splitext(pt_path)[0] + ".engine"
+        if os.path.exists(engine_path):
+            return engine_path
+        
+        try:
+            import torch
+            if not torch.cuda.is_available():
+                return None
+            
+            logger.info(f"Exporting {pt_path} to TensorRT FP16 (one-time): {engine_path}")
+            return YOLO(pt_path).export(
+                format="engine",
+                half=True,
+                simplify=True,
+                imgsz=self.IMG_SIZE,
+                dynamic=True,
+                batch=self.batch_size
+            )
+        except Exception as e:
+            logger.warning(f"TensorRT export failed, using PyTorch weights: {e}")
+            return None
+    
+    def _warmup(self):
+        """Run a few dummy batches so the first real frames don't pay the cold-start cost"""
+        dummy = [np.zeros((self.IMG_SIZE, self.IMG_SIZE, 3), dtype=np.uint8)] * self.batch_size
+        for _ in range(self.WARMUP_ITERATIONS):
+            self.model(dummy, verbose=False)
+    
+    def _init_input_buffers(self):
+        """Allocate the reusable model input batch when running on CUDA"""
+        try:
+            import torch
+        except ImportError:
+            return
+        if not torch.cuda.is_available():
+            return
+        
+        size = self.IMG_SIZE
+        # Page-locked staging so the upload is a true async DMA; frames are resized
+        # straight into it through a NumPy view
+        self._pinned = torch.empty((self.batch_size, size, size, 3), dtype=torch.uint8, pin_memory=True)
+        self._rsz_buf = self._pinned.numpy()
+        self._input = torch.empty((self.batch_size, 3, size, size), dtype=torch.float16, device="cuda")
+        self._copy_stream = torch.cuda.Stream()
+        self._copy_done = torch.cuda.Event()
+    
+    def _to_model_input(self, frames: List[np.ndarray]):
+        """
+        Letterbox frames straight into the persistent input batch and upload it,
+        skipping Ultralytics' per-call preprocessing and numpy->torch conversion.
+        Returns (source, letterboxes); each (gain, pad_x, pad_y) maps boxes back
+        to its frame, and letterboxes is None when frames are passed through unchanged.
+        """
+        n = len(frames)
+        if self._input is None or n > self.batch_size:
+            return frames, None
+        
+        # The previous upload must finish reading the staging buffer before it is reused
+        self._copy_done.synchronize()
+        
+        size = self.IMG_SIZE
+        letterboxes = []
+        for i, frame in enumerate(frames):
+            # Keep the aspect ratio the model was trained on: scale the long side
+            # to size and pad the short side evenly, as Ultralytics' LetterBox does
+            h, w = frame.shape[:2]
+            gain = min(size / w, size / h)
+            new_w, new_h = round(w * gain), round(h * gain)
+            left, top = (size - new_w) // 2, (size - new_h) // 2
+            
+            slot = self._rsz_buf[i]
+            slot[:top] = self.LETTERBOX_FILL
+            slot[top + new_h:] = self.LETTERBOX_FILL
+            slot[top:top + new_h, :left] = self.LETTERBOX_FILL
+            slot[top:top + new_h, left + new_w:] = self.LETTERBOX_FILL
+            slot[top:top + new_h, left:left + new_w] = cv2.resize(
+                frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR
+            )
+            letterboxes.append((gain, left, top))
+        
+        import torch
+        batch = self._input[:n]
+        with torch.cuda.stream(self._copy_stream):
+            staged = self._pinned[:n].to(self._input.device, non_blocking=True)
+            # NHWC BGR uint8 -> NCHW RGB in [0, 1]
+            batch.copy_(staged.permute(0, 3, 1, 2).flip(1))
+            batch.div_(255)
+            self._copy_done.record()
+        torch.cuda.current_stream().wait_stream(self._copy_stream)
+        return batch, letterboxes
+    
     def detect(self, frame: np.ndarray, frame_id: int = 0) -> AccidentDetection:
         """
         Run detection on a single frame.
@@ -105,46 +385,81 @@ class AccidentDetector:
             raise RuntimeError("Model not loaded")
         
         # Run YOLO inference
-        results = self.model(frame, verbose=False)[0]
+        source, letterboxes = self._to_model_input([frame])
+        results = self.model(source, verbose=False)[0]
         
-        # Parse detections
-        vehicles = []
-        pedestrians = []
-        bounding_boxes = []
+        return self._build_detection(results, frame.shape, frame_id, letterboxes[0] if letterboxes else None)
+    
+    def detect_batch(self, frames: List[np.ndarray], frame_ids: List[int]) -> List[AccidentDetection]:
+        """
+        Run detection on several frames with a single model call.
         
-        for box in results.boxes:
-            class_id = int(box.cls[0])
-            confidence = float(box.conf[0])
-            
-            if confidence < self.confidence_threshold:
-                continue
-            
-            x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
-            center = ((x1 + x2) // 2, (y1 + y2) // 2)
-            
-            detection = DetectionResult(
-                class_id=class_id,
-                class_name=results.names[class_id],
-                confidence=confidence,
-                bbox=(x1, y1, x2, y2),
-                center=center
-            )
-            
-            bbox_dict = {
-                "class": results.names[class_id],
-                "confidence": confidence,
-                "bbox": [x1, y1, x2, y2]
-            }
-            bounding_boxes.append(bbox_dict)
+        Args:
+            frames: BGR images from OpenCV
+            frame_ids: Frame numbers, parallel to frames
             
-            if class_id in self.VEHICLE_CLASSES:
-                vehicles.append(detection)
-            elif class_id == self.PERSON_CLASS:
-                pedestrians.append(detection)
+        Returns:
+            One AccidentDetection per frame, in order
+        """
+        if self.model is None:
+            raise RuntimeError("Model not loaded")
+        if not frames:
+            return []
+        
+        source, letterboxes = self._to_model_input(frames)
+        results = self.model(source, verbose=False)
+        
+        return [
+            self._build_detection(result, frame.shape, frame_id, letterboxes[i] if letterboxes else None)
+            for i, (result, frame, frame_id) in enumerate(zip(results, frames, frame_ids))
+        ]
+    
+    def _build_detection(
+        self,
+        results,
+        frame_shape: Tuple,
+        frame_id: int,
+        letterbox: Optional[Tuple[float, int, int]] = None
+    ) -> AccidentDetection:
+        """
+        Turn one frame's YOLO results into an AccidentDetection.
+        letterbox is the (gain, pad_x, pad_y) the frame was fitted into the
+        model input with; boxes are mapped back to frame pixels with it.
+        """
+        # Pull all boxes off the device once: rows of x1, y1, x2, y2, (track id,) conf, cls
+        data = results.boxes.data.cpu().numpy()
+        
+        # Drop low-confidence boxes and classes that are neither vehicles nor people
+        # before anything is converted or allocated per box
+        cls = data[:, -1].astype(np.int32)
+        keep = (data[:, -2] >= self.confidence_threshold) & (self._vehicle_lut[cls] | (cls == self.PERSON_CLASS))
+        data = data[keep]
+        if letterbox is not None:
+            gain, pad_x, pad_y = letterbox
+            data[:, [0, 2]] -= pad_x
+            data[:, [1, 3]] -= pad_y
+            data[:, :4] /= gain
+            data[:, [0, 2]] = data[:, [0, 2]].clip(0, frame_shape[1])
+            data[:, [1, 3]] = data[:, [1, 3]].clip(0, frame_shape[0])
+        
+        boxes = data[:, :4].astype(np.int32)
+        confidences = data[:, -2].astype(np.float32)
+        class_ids = data[:, -1].astype(np.int32)
+        names = self._names
+        
+        veh_mask = self._vehicle_lut[class_ids]
+        ped_mask = class_ids == self.PERSON_CLASS
+        vehicles = DetectionArray(boxes[veh_mask], confidences[veh_mask], class_ids[veh_mask], names)
+        pedestrians = DetectionArray(boxes[ped_mask], confidences[ped_mask], class_ids[ped_mask], names)
+        
+        bounding_boxes = [
+            {"class": names[class_id], "confidence": confidence, "bbox": bbox}
+            for bbox, confidence, class_id in zip(boxes.tolist(), confidences.tolist(), class_ids.tolist())
+        ]
         
         # Classify incident type
         incident_type, confidence, description = self._classify_incident(
-            vehicles, pedestrians, frame.shape
+            vehicles, pedestrians, frame_shape
         )
         
         detected = incident_type != IncidentType.OTHER and confidence >= self.confidence_threshold
@@ -162,8 +477,8 @@ class AccidentDetector:
     
     def _classify_incident(
         self, 
-        vehicles: List[DetectionResult], 
-        pedestrians: List[DetectionResult],
+        vehicles: DetectionArray, 
+        pedestrians: DetectionArray,
         frame_shape: Tuple
     ) -> Tuple[IncidentType, float, str]:
         """
@@ -175,22 +490,37 @@ class AccidentDetector:
         if not vehicles:
             return IncidentType.OTHER, 0.0, "No vehicles detected"
         
+        if NUMBA_AVAILABLE:
+            return self._classify_compiled(vehicles, pedestrians)
+        return self._classify_rules(vehicles, pedestrians)
+    
+    def _classify_rules(self, vehicles: DetectionArray, pedestrians: DetectionArray) -> Tuple[IncidentType, float, str]:
+        """_classify_incident in NumPy/Python, for a frame with at least one vehicle"""
+        # Common case: one vehicle and nobody nearby, so only rollover applies
+        if len(vehicles) == 1 and not pedestrians:
+            return self._check_rollover(vehicles) or (
+                IncidentType.OTHER, 0.0, "Normal traffic: 1 vehicle(s) detected"
+            )
+        
         # Check for vehicle-pedestrian impact
-        if pedestrians and vehicles:
-            for ped in pedestrians:
-                for vehicle in vehicles:
-                    if self._check_proximity(ped.bbox, vehicle.bbox):
-                        return (
-                            IncidentType.PEDESTRIAN_IMPACT,
-                            max(ped.confidence, vehicle.confidence),
-                            f"Potential pedestrian-vehicle incident detected. {len(vehicles)} vehicle(s), {len(pedestrians)} pedestrian(s) in close proximity."
-                        )
+        if pedestrians:
+            close = self._close_pairs(pedestrians, vehicles)
+            if close is not None:
+                p, v = close
+                return (
+                    IncidentType.PEDESTRIAN_IMPACT,
+                    float(max(pedestrians.confidence[p], vehicles.confidence[v])),
+                    f"Potential pedestrian-vehicle incident detected. {len(vehicles)} vehicle(s), {len(pedestrians)} pedestrian(s) in close proximity."
+                )
+        
+        # Overlapping vehicle pairs, computed once for both overlap checks
+        pairs = self._overlapping_pairs(vehicles)
         
         # Check for multi-vehicle pile-up
         if len(vehicles) >= 3:
-            overlapping = self._count_overlapping_vehicles(vehicles)
+            overlapping = self._count_overlapping_vehicles(pairs)
             if overlapping >= 2:
-                avg_conf = sum(v.confidence for v in vehicles) / len(vehicles)
+                avg_conf = float(vehicles.confidence.mean())
                 return (
                     IncidentType.MULTI_VEHICLE,
                     avg_conf,
@@ -198,85 +528,144 @@ class AccidentDetector:
                 )
         
         # Check for collision between 2 vehicles
-        if len(vehicles) >= 2:
-            for i, v1 in enumerate(vehicles):
-                for v2 in vehicles[i+1:]:
-                    iou = self._calculate_iou(v1.bbox, v2.bbox)
-                    if iou > self.COLLISION_IOU_THRESHOLD:
-                        return (
-                            IncidentType.VEHICLE_COLLISION,
-                            max(v1.confidence, v2.confidence),
-                            f"Vehicle collision detected. 2 vehicles overlapping with IoU {iou:.2f}."
-                        )
-        
-        # Check for rollover (unusual aspect ratio)
-        for vehicle in vehicles:
-            x1, y1, x2, y2 = vehicle.bbox
-            width = x2 - x1
-            height = y2 - y1
-            aspect_ratio = width / max(height, 1)
-            
-            # Very wide or very tall indicates possible rollover
-            if aspect_ratio < self.ROLLOVER_ASPECT_RATIO or aspect_ratio > 1 / self.ROLLOVER_ASPECT_RATIO:
+        for i, j, iou in pairs:
+            if iou > self.COLLISION_IOU_THRESHOLD:
                 return (
-                    IncidentType.ROLLOVER,
-                    vehicle.confidence,
-                    f"Possible vehicle rollover detected. Unusual aspect ratio: {aspect_ratio:.2f}."
+                    IncidentType.VEHICLE_COLLISION,
+                    float(max(vehicles.confidence[i], vehicles.confidence[j])),
+                    f"Vehicle collision detected. 2 vehicles overlapping with IoU {iou:.2f}."
                 )
         
-        return IncidentType.OTHER, 0.0, f"Normal traffic: {len(vehicles)} vehicle(s) detected"
+        # Check for rollover (unusual aspect ratio)
+        return self._check_rollover(vehicles) or (
+            IncidentType.OTHER, 0.0, f"Normal traffic: {len(vehicles)} vehicle(s) detected"
+        )
     
-    def _check_proximity(self, bbox1: Tuple, bbox2: Tuple, threshold: int = 50) -> bool:
-        """Check if two bounding boxes are in close proximity"""
-        x1_1, y1_1, x2_1, y2_1 = bbox1
-        x1_2, y1_2, x2_2, y2_2 = bbox2
+    def _classify_compiled(self, vehicles: DetectionArray, pedestrians: DetectionArray) -> Tuple[IncidentType, float, str]:
+        """_classify_incident via the Numba kernel; same rules, same descriptions"""
+        code, confidence, meta = _classify_jit(
+            vehicles.bbox, vehicles.confidence, pedestrians.bbox, pedestrians.confidence,
+            self.COLLISION_IOU_THRESHOLD, self.ROLLOVER_ASPECT_RATIO, 1 / self.ROLLOVER_ASPECT_RATIO, 50
+        )
+        incident_type = IncidentType(code)
+        n_v = len(vehicles)
         
-        center1 = ((x1_1 + x2_1) // 2, (y1_1 + y2_1) // 2)
-        center2 = ((x1_2 + x2_2) // 2, (y1_2 + y2_2) // 2)
+        if incident_type is IncidentType.PEDESTRIAN_IMPACT:
+            description = f"Potential pedestrian-vehicle incident detected. {n_v} vehicle(s), {len(pedestrians)} pedestrian(s) in close proximity."
+        elif incident_type is IncidentType.MULTI_VEHICLE:
+            description = f"Multi-vehicle pile-up detected. {n_v} vehicles with {int(meta)} overlapping."
+        elif incident_type is IncidentType.VEHICLE_COLLISION:
+            description = f"Vehicle collision detected. 2 vehicles overlapping with IoU {meta:.2f}."
+        elif incident_type is IncidentType.ROLLOVER:
+            description = f"Possible vehicle rollover detected. Unusual aspect ratio: {meta:.2f}."
+        else:
+            description = f"Normal traffic: {n_v} vehicle(s) detected"
         
-        distance = np.sqrt((center1[0] - center2[0])**2 + (center1[1] - center2[1])**2)
+        return incident_type, float(confidence), description
+    
+    def _check_rollover(self, vehicles: DetectionArray) -> Optional[Tuple[IncidentType, float, str]]:
+        """Rollover classification for the first vehicle with an unusual aspect ratio, if any"""
+        boxes = vehicles.bbox
+        aspect_ratio = (boxes[:, 2] - boxes[:, 0]) / np.maximum(boxes[:, 3] - boxes[:, 1], 1)
         
-        # Factor in box sizes
-        avg_size = ((x2_1 - x1_1) + (x2_2 - x1_2)) / 2
+        # Very wide or very tall indicates possible rollover
+        unusual = np.flatnonzero(
+            (aspect_ratio < self.ROLLOVER_ASPECT_RATIO) | (aspect_ratio > 1 / self.ROLLOVER_ASPECT_RATIO)
+        )
+        if not unusual.size:
+            return None
         
-        return distance < avg_size + threshold
+        i = unusual[0]
+        return (
+            IncidentType.ROLLOVER,
+            float(vehicles.confidence[i]),
+            f"Possible vehicle rollover detected. Unusual aspect ratio: {aspect_ratio[i]:.2f}."
+        )
     
-    def _calculate_iou(self, bbox1: Tuple, bbox2: Tuple) -> float:
-        """Calculate Intersection over Union between two bounding boxes"""
-        x1_1, y1_1, x2_1, y2_1 = bbox1
-        x1_2, y1_2, x2_2, y2_2 = bbox2
+    def _close_pairs(
+        self,
+        pedestrians: DetectionArray,
+        vehicles: DetectionArray,
+        threshold: int = 50
+    ) -> Optional[Tuple[int, int]]:
+        """
+        First (pedestrian, vehicle) index pair in close proximity, or None.
+        Close means center distance below the pair's mean box width plus threshold;
+        all pairs are tested in one broadcasted pass.
+        """
+        ped = pedestrians.bbox
+        veh = vehicles.bbox
         
-        # Intersection
-        x1_i = max(x1_1, x1_2)
-        y1_i = max(y1_1, y1_2)
-        x2_i = min(x2_1, x2_2)
-        y2_i = min(y2_1, y2_2)
+        ped_centers = np.stack([(ped[:, 0] + ped[:, 2]) // 2, (ped[:, 1] + ped[:, 3]) // 2], axis=1)
+        veh_centers = np.stack([(veh[:, 0] + veh[:, 2]) // 2, (veh[:, 1] + veh[:, 3]) // 2], axis=1)
+        delta = ped_centers[:, None, :] - veh_centers[None, :, :]
+        distance = np.hypot(delta[..., 0], delta[..., 1])
         
-        if x2_i < x1_i or y2_i < y1_i:
-            return 0.0
+        # Factor in box sizes
+        avg_size = ((ped[:, 2] - ped[:, 0])[:, None] + (veh[:, 2] - veh[:, 0])[None, :]) / 2
         
-        intersection = (x2_i - x1_i) * (y2_i - y1_i)
+        close = np.argwhere(distance < avg_size + threshold)
+        if not len(close):
+            return None
+        return int(close[0, 0]), int(close[0, 1])
+    
+    def _overlapping_pairs(self, vehicles: DetectionArray) -> List[Tuple[int, int, float]]:
+        """(i, j, iou) for every overlapping vehicle pair with i < j, in row-major order"""
+        n = len(vehicles)
+        if n < 2:
+            return []
         
-        # Union
-        area1 = (x2_1 - x1_1) * (y2_1 - y1_1)
-        area2 = (x2_2 - x1_2) * (y2_2 - y1_2)
-        union = area1 + area2 - intersection
+        if n < self.VECTORIZED_IOU_MIN_VEHICLES:
+            boxes = vehicles.bbox.tolist()
+            pairs = []
+            for i in range(n):
+                for j in range(i + 1, n):
+                    iou = _iou_scalar(boxes[i], boxes[j])
+                    if iou > 0:
+                        pairs.append((i, j, iou))
+            return pairs
         
-        return intersection / max(union, 1)
+        boxes = vehicles.bbox.astype(np.float32)
+        iou = np.triu(box_iou(boxes, boxes), 1)
+        return [(int(i), int(j), float(iou[i, j])) for i, j in np.argwhere(iou > 0)]
     
-    def _count_overlapping_vehicles(self, vehicles: List[DetectionResult]) -> int:
-        """Count number of overlapping vehicle pairs"""
-        count = 0
-        for i, v1 in enumerate(vehicles):
-            for v2 in vehicles[i+1:]:
-                if self._calculate_iou(v1.bbox, v2.bbox) > 0.1:
-                    count += 1
-        return count
+    def _count_overlapping_vehicles(self, pairs: List[Tuple[int, int, float]]) -> int:
+        """Count vehicle pairs overlapping by more than IoU 0.1"""
+        return sum(1 for _, _, iou in pairs if iou > 0.1)
+    
+    def _draw_boxes(self, img: np.ndarray, detections: DetectionArray, color: Tuple[int, int, int]):
+        """Outline all boxes with one polylines call, then label each"""
+        if not detections:
+            return
+        
+        boxes = detections.bbox
+        x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+        corners = np.stack([
+            np.stack([x1, y1], axis=1),
+            np.stack([x2, y1], axis=1),
+            np.stack([x2, y2], axis=1),
+            np.stack([x1, y2], axis=1)
+        ], axis=1)
+        cv2.polylines(img, list(corners), True, color, 2)
+        
+        for (bx1, by1, _, _), confidence, class_id in zip(
+            boxes.tolist(), detections.confidence.tolist(), detections.class_id.tolist()
+        ):
+            prefix = self._label_prefixes.get(class_id)
+            if prefix is None:
+                prefix = self._label_prefixes[class_id] = (
+                    "Person: " if class_id == self.PERSON_CLASS else f"{detections.names[class_id]}: "
+                )
+            cv2.putText(img, f"{prefix}{confidence:.2f}", (bx1, by1 - 10),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
     
     def draw_detections(self, frame: np.ndarray, detection: AccidentDetection) -> np.ndarray:
         """
         Draw bounding boxes and labels on frame.
         
+        The result lives in a scratch buffer reused by the next call, so
+        save or copy it before drawing again.
+        
         Args:
             frame: Original frame
             detection: AccidentDetection result
@@ -284,27 +673,18 @@ class AccidentDetector:
         Returns:
             Annotated frame
         """
-        annotated = frame.copy()
-        
-        # Draw vehicle boxes (green)
-        for vehicle in detection.vehicles:
-            x1, y1, x2, y2 = vehicle.bbox
-            cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            label = f"{vehicle.class_name}: {vehicle.confidence:.2f}"
-            cv2.putText(annotated, label, (x1, y1 - 10), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-        
-        # Draw pedestrian boxes (blue)
-        for ped in detection.pedestrians:
-            x1, y1, x2, y2 = ped.bbox
-            cv2.rectangle(annotated, (x1, y1), (x2, y2), (255, 0, 0), 2)
-            label = f"Person: {ped.confidence:.2f}"
-            cv2.putText(annotated, label, (x1, y1 - 10),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+        if self._annot_buf is None or self._annot_buf.shape != frame.shape or self._annot_buf.dtype != frame.dtype:
+            self._annot_buf = np.empty_like(frame)
+        annotated = self._annot_buf
+        np.copyto(annotated, frame)
+        
+        # Vehicle boxes (green), pedestrian boxes (blue)
+        self._draw_boxes(annotated, detection.vehicles, (0, 255, 0))
+        self._draw_boxes(annotated, detection.pedestrians, (255, 0, 0))
         
         # Draw incident info
         if detection.detected:
-            cv2.putText(annotated, f"INCIDENT: {detection.incident_type.value}",
+            cv2.putText(annotated, f"INCIDENT: {INCIDENT_TYPE_NAMES[detection.incident_type]}",
                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
             cv2.putText(annotated, f"Confidence: {detection.confidence:.2f}",
                        (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
@@ -312,6 +692,18 @@ class AccidentDetector:
         return annotated
 
 
+def warmup_kernels():
+    """Compile the classification kernel (or load it from the Numba cache) on dummy input"""
+    if not NUMBA_AVAILABLE:
+        return
+    ratio = AccidentDetector.ROLLOVER_ASPECT_RATIO
+    _classify_jit(
+        np.zeros((1, 4), dtype=np.int32), np.zeros(1, dtype=np.float32),
+        np.zeros((0, 4), dtype=np.int32), np.zeros(0, dtype=np.float32),
+        AccidentDetector.COLLISION_IOU_THRESHOLD, ratio, 1 / ratio, 50
+    )
+
+
 if __name__ == "__main__":
     # Test the detector
     detector = AccidentDetector()
@@ -6,25 +6,46 @@ import os
 import json
 import httpx
 import asyncio
-from typing import Optional, List, Dict
-from dataclasses import dataclass, asdict
+import threading
+import time
+from concurrent.futures import Future, wait
+from typing import Optional, List, Dict, Iterator
+from dataclasses import dataclass, asdict, replace
 from datetime import datetime
 import logging
 
-from detector import AccidentDetector, AccidentDetection, IncidentType
-from severity_scorer import SeverityScorer, SeverityFactors, SeverityLevel
+import cv2
+import numpy as np
+
+from detector import AccidentDetector, AccidentDetection, IncidentType, INCIDENT_TYPE_NAMES
+from severity_scorer import SeverityScorer, SeverityFactors, SeverityLevel, SEVERITY_NAMES
 from video_processor import VideoProcessor, FrameData
+import _warmup
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_warmup.prewarm_from_env()
+
+# Confidence change below which a repeat incident reuses the last severity
+SEVERITY_REUSE_CONFIDENCE_DELTA = 0.02
+
+# Side of the grayscale thumbnail used to compare consecutive frames
+SIMILARITY_THUMB_SIZE = 64
+
+
+def _thumbnail(frame: np.ndarray) -> np.ndarray:
+    """Small int16 grayscale copy of a BGR frame for cheap change detection"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, (SIMILARITY_THUMB_SIZE, SIMILARITY_THUMB_SIZE), interpolation=cv2.INTER_AREA).astype(np.int16)
+
 
 @dataclass
 class IncidentReport:
     """Incident report ready for API submission"""
     camera_id: int
-    incident_type: str
-    severity: str
+    incident_type: IncidentType  # serialized with INCIDENT_TYPE_NAMES
+    severity: SeverityLevel  # serialized with SEVERITY_NAMES
     confidence_score: float
     vehicles_involved: int
     pedestrian_involved: bool
@@ -47,7 +68,10 @@ class InferencePipeline:
         model_path: str = "yolov8n.pt",
         sample_fps: int = 5,
         confidence_threshold: float = 0.85,
-        consecutive_frames_required: int = 3
+        consecutive_frames_required: int = 3,
+        batch_size: int = 8,
+        similarity_threshold: float = 3.0,
+        opencv_threads: int = 1
     ):
         """
         Initialize the pipeline.
@@ -58,19 +82,50 @@ class InferencePipeline:
             sample_fps: Frame sampling rate
             confidence_threshold: Minimum confidence for incident
             consecutive_frames_required: Number of consecutive detection frames to confirm incident
+            batch_size: Frames per model call when processing video files
+            similarity_threshold: Mean absolute thumbnail difference (0-255) below which a
+                frame reuses the previous detection instead of running the model (0 disables)
+            opencv_threads: OpenCV worker threads (cv2.setNumThreads is process-wide),
+                kept low so decoding doesn't compete with inference for cores;
+                the previous value is restored by close()
         """
         self.api_base_url = api_base_url
         self.confidence_threshold = confidence_threshold
         self.consecutive_frames_required = consecutive_frames_required
+        self.batch_size = batch_size
+        self.similarity_threshold = similarity_threshold
         
         # Initialize components
-        self.detector = AccidentDetector(model_path=model_path, confidence_threshold=0.5)
+        self.detector = AccidentDetector(model_path=model_path, confidence_threshold=0.5, batch_size=batch_size)
         self.scorer = SeverityScorer()
         self.video_processor = VideoProcessor(sample_fps=sample_fps)
         
+        self._prev_opencv_threads = cv2.getNumThreads()
+        cv2.setNumThreads(opencv_threads)
+        
         # Tracking
         self.detection_buffer: List[AccidentDetection] = []
         self.incidents_reported: List[str] = []
+        
+        # Submissions run on a background event loop with one shared client,
+        # so the detection loop never waits on the API
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, name="incident-submit", daemon=True)
+        self._loop_thread.start()
+        self._client = httpx.AsyncClient(
+            base_url=api_base_url,
+            timeout=30.0,
+            limits=httpx.Limits(max_keepalive_connections=4)
+        )
+        self._pending: set = set()
+        
+        # Last scored (incident type, vehicle count, pedestrian, confidence) and its level
+        self._last_severity_key: Optional[tuple] = None
+        self._last_severity: Optional[SeverityLevel] = None
+        
+        # Last frame actually run through the model, for similarity gating
+        self._prev_small: Optional[np.ndarray] = None
+        self._prev_detection: Optional[AccidentDetection] = None
     
     def process_video(
         self,
@@ -99,80 +154,76 @@ class InferencePipeline:
         clips_dir = os.path.join(output_dir, "clips")
         os.makedirs(snapshots_dir, exist_ok=True)
         os.makedirs(clips_dir, exist_ok=True)
+        snap_prefix = os.path.join(snapshots_dir, "incident_")
+        clip_prefix = os.path.join(clips_dir, "clip_")
         
         # Load video
         video_info = self.video_processor.load_video(video_path)
         
         incidents: List[IncidentReport] = []
         self.detection_buffer = []
+        self._prev_small = None
+        self._prev_detection = None
         
         try:
-            for frame_data in self.video_processor.extract_frames():
-                detection = self.detector.detect(frame_data.frame, frame_data.frame_id)
+            for batch in self._frame_batches():
+                detections = self._detect_with_reuse(batch)
+                batch_timestamp = None  # report timestamp, taken once per batch
+                for frame_data, detection in zip(batch, detections):
                 
-                # Check for incident
-                if detection.detected and detection.confidence >= self.confidence_threshold:
-                    self.detection_buffer.append(detection)
+                    # Check for incident
+                    if detection.detected and detection.confidence >= self.confidence_threshold:
+                        self.detection_buffer.append(detection)
                     
-                    # Confirm incident after consecutive detections
-                    if len(self.detection_buffer) >= self.consecutive_frames_required:
-                        # Calculate severity
-                        factors = SeverityFactors(
-                            vehicle_count=len(detection.vehicles),
-                            pedestrian_involved=len(detection.pedestrians) > 0,
-                            is_rollover=detection.incident_type == IncidentType.ROLLOVER,
-                            is_multi_vehicle=detection.incident_type == IncidentType.MULTI_VEHICLE,
-                            detection_confidence=detection.confidence
-                        )
-                        severity, score, _ = self.scorer.calculate_severity(factors)
+                        # Confirm incident after consecutive detections
+                        if len(self.detection_buffer) >= self.consecutive_frames_required:
+                            # Calculate severity
+                            severity = self._severity(detection)
                         
-                        # Save snapshot
-                        snapshot_path = os.path.join(
-                            snapshots_dir,
-                            f"incident_{frame_data.frame_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-                        )
-                        annotated = self.detector.draw_detections(frame_data.frame, detection)
-                        self.video_processor.save_snapshot(annotated, snapshot_path)
+                            # Save snapshot (file names carry epoch milliseconds)
+                            ts = int(time.time() * 1000)
+                            snapshot_path = f"{snap_prefix}{frame_data.frame_id}_{ts}.jpg"
+                            annotated = self.detector.draw_detections(frame_data.frame, detection)
+                            self.video_processor.save_snapshot(annotated, snapshot_path)
                         
-                        # Extract video clip (5 seconds before and after)
-                        clip_start = max(0, frame_data.timestamp - 5)
-                        clip_end = min(video_info.duration_seconds, frame_data.timestamp + 5)
-                        clip_path = os.path.join(
-                            clips_dir,
-                            f"clip_{frame_data.frame_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
-                        )
+                            # Extract video clip (5 seconds before and after)
+                            clip_start = max(0, frame_data.timestamp - 5)
+                            clip_end = min(video_info.duration_seconds, frame_data.timestamp + 5)
+                            clip_path = f"{clip_prefix}{frame_data.frame_id}_{ts}.mp4"
                         
-                        # Note: Clip extraction requires video reload, skipping for performance
-                        # self.video_processor.extract_clip(clip_start, clip_end, clip_path)
+                            # Note: Clip extraction requires video reload, skipping for performance
+                            # self.video_processor.extract_clip(clip_start, clip_end, clip_path)
                         
-                        # Create incident report
-                        report = IncidentReport(
-                            camera_id=camera_id,
-                            incident_type=detection.incident_type.value,
-                            severity=severity.value,
-                            confidence_score=detection.confidence,
-                            vehicles_involved=len(detection.vehicles),
-                            pedestrian_involved=len(detection.pedestrians) > 0,
-                            description=detection.description,
-                            video_clip_path=None,  # clip_path if extracted
-                            snapshots=[snapshot_path],
-                            bounding_boxes=detection.bounding_boxes,
-                            timestamp=datetime.now().isoformat()
-                        )
+                            # Create incident report
+                            if batch_timestamp is None:
+                                batch_timestamp = datetime.now().isoformat()
+                            report = IncidentReport(
+                                camera_id=camera_id,
+                                incident_type=detection.incident_type,
+                                severity=severity,
+                                confidence_score=detection.confidence,
+                                vehicles_involved=len(detection.vehicles),
+                                pedestrian_involved=len(detection.pedestrians) > 0,
+                                description=detection.description,
+                                video_clip_path=None,  # clip_path if extracted
+                                snapshots=[snapshot_path],
+                                bounding_boxes=detection.bounding_boxes,
+                                timestamp=batch_timestamp
+                            )
                         
-                        incidents.append(report)
-                        logger.info(f"INCIDENT DETECTED: {detection.incident_type.value} - Severity: {severity.value}")
+                            incidents.append(report)
+                            logger.info(f"INCIDENT DETECTED: {INCIDENT_TYPE_NAMES[detection.incident_type]} - Severity: {SEVERITY_NAMES[severity]}")
                         
-                        # Submit to API
-                        if submit_to_api:
-                            asyncio.run(self._submit_incident(report))
+                            # Submit to API
+                            if submit_to_api:
+                                self.submit_incident(report)
                         
-                        # Reset buffer to avoid duplicate reports
-                        self.detection_buffer = []
-                else:
-                    # Reset buffer if detection chain broken
-                    if self.detection_buffer:
-                        self.detection_buffer = []
+                            # Reset buffer to avoid duplicate reports
+                            self.detection_buffer = []
+                    else:
+                        # Reset buffer if detection chain broken
+                        if self.detection_buffer:
+                            self.detection_buffer = []
         
         finally:
             self.video_processor.close()
@@ -180,39 +231,134 @@ class InferencePipeline:
         logger.info(f"Processing complete. Detected {len(incidents)} incidents.")
         return incidents
     
+    def _severity(self, detection: AccidentDetection) -> SeverityLevel:
+        """
+        Severity for a confirmed detection. Consecutive incidents of the same
+        type, vehicle count and pedestrian involvement with confidence within
+        SEVERITY_REUSE_CONFIDENCE_DELTA reuse the last score.
+        """
+        incident_type = detection.incident_type
+        vehicle_count = len(detection.vehicles)
+        pedestrian_involved = bool(detection.pedestrians)
+        
+        last = self._last_severity_key
+        if (
+            last is not None
+            and last[0] is incident_type
+            and last[1] == vehicle_count
+            and last[2] == pedestrian_involved
+            and abs(last[3] - detection.confidence) < SEVERITY_REUSE_CONFIDENCE_DELTA
+        ):
+            return self._last_severity
+        
+        factors = SeverityFactors(
+            vehicle_count=vehicle_count,
+            pedestrian_involved=pedestrian_involved,
+            is_rollover=incident_type is IncidentType.ROLLOVER,
+            is_multi_vehicle=incident_type is IncidentType.MULTI_VEHICLE,
+            detection_confidence=detection.confidence
+        )
+        severity, _, _ = self.scorer.calculate_severity(factors)
+        
+        self._last_severity_key = (incident_type, vehicle_count, pedestrian_involved, detection.confidence)
+        self._last_severity = severity
+        return severity
+    
+    def _frame_batches(self) -> Iterator[List[FrameData]]:
+        """
+        Group sampled frames into lists of up to batch_size. Frames are decoded
+        ahead on the processor's background thread, overlapping with inference.
+        """
+        # Frames alive at once: the batch being detected, a full queue and the one
+        # being queued; the decoder's buffer ring must outlast all of them
+        queue_size = 2 * self.batch_size
+        frames = self.video_processor.extract_frames_async(
+            queue_size=queue_size, pool_size=queue_size + self.batch_size + 2
+        )
+        
+        batch: List[FrameData] = []
+        for frame_data in frames:
+            batch.append(frame_data)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    def _detect_with_reuse(self, batch: List[FrameData]) -> List[AccidentDetection]:
+        """
+        Detect on a batch, skipping frames that barely differ from the last
+        inferred frame; those reuse its detection with their own frame_id.
+        """
+        to_infer = []
+        for i, frame_data in enumerate(batch):
+            small = _thumbnail(frame_data.frame)
+            if self._prev_small is not None and np.mean(np.abs(small - self._prev_small)) < self.similarity_threshold:
+                continue
+            self._prev_small = small
+            to_infer.append(i)
+        
+        inferred = dict(zip(to_infer, self.detector.detect_batch(
+            [batch[i].frame for i in to_infer], [batch[i].frame_id for i in to_infer]
+        )))
+        
+        detections = []
+        for i, frame_data in enumerate(batch):
+            detection = inferred.get(i)
+            if detection is None:
+                detection = replace(self._prev_detection, frame_id=frame_data.frame_id)
+            else:
+                self._prev_detection = detection
+            detections.append(detection)
+        return detections
+    
+    def submit_incident(self, report: IncidentReport) -> Future:
+        """Queue an incident for submission without blocking; returns a Future[bool]"""
+        future = asyncio.run_coroutine_threadsafe(self._submit_incident(report), self._loop)
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        return future
+    
+    def close(self, timeout: float = 30.0):
+        """Wait for queued submissions, then shut down the client and its event loop"""
+        if self._loop.is_closed():
+            return
+        if self._pending:
+            wait(list(self._pending), timeout=timeout)
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result(timeout=timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join(timeout=timeout)
+        self._loop.close()
+        cv2.setNumThreads(self._prev_opencv_threads)
+    
     async def _submit_incident(self, report: IncidentReport) -> bool:
         """Submit incident to backend API"""
         try:
-            async with httpx.AsyncClient() as client:
-                # Convert report to API format
-                payload = {
-                    "camera_id": report.camera_id,
-                    "incident_type": report.incident_type,
-                    "severity": report.severity,
-                    "confidence_score": report.confidence_score,
-                    "vehicles_involved": report.vehicles_involved,
-                    "pedestrian_involved": report.pedestrian_involved,
-                    "description": report.description,
-                    "video_clip_path": report.video_clip_path,
-                    "snapshots": report.snapshots,
-                    "bounding_boxes": report.bounding_boxes
-                }
-                
-                response = await client.post(
-                    f"{self.api_base_url}/incidents/",
-                    json=payload,
-                    timeout=30.0
-                )
+            # Convert report to API format
+            payload = {
+                "camera_id": report.camera_id,
+                "incident_type": INCIDENT_TYPE_NAMES[report.incident_type],
+                "severity": SEVERITY_NAMES[report.severity],
+                "confidence_score": report.confidence_score,
+                "vehicles_involved": report.vehicles_involved,
+                "pedestrian_involved": report.pedestrian_involved,
+                "description": report.description,
+                "video_clip_path": report.video_clip_path,
+                "snapshots": report.snapshots,
+                "bounding_boxes": report.bounding_boxes
+            }
+            
+            response = await self._client.post("/incidents/", json=payload)
+            
+            if response.status_code == 200:
+                result = response.json()
+                logger.info(f"Incident submitted: {result.get('incident_id')}")
+                self.incidents_reported.append(result.get('incident_id'))
+                return True
+            else:
+                logger.error(f"Failed to submit incident: {response.status_code}")
+                return False
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    logger.info(f"Incident submitted: {result.get('incident_id')}")
-                    self.incidents_reported.append(result.get('incident_id'))
-                    return True
-                else:
-                    logger.error(f"Failed to submit incident: {response.status_code}")
-                    return False
-                    
         except Exception as e:
             logger.error(f"API submission error: {e}")
             return False
@@ -241,19 +387,12 @@ class InferencePipeline:
             
             if len(self.detection_buffer) >= self.consecutive_frames_required:
                 # Calculate severity
-                factors = SeverityFactors(
-                    vehicle_count=len(detection.vehicles),
-                    pedestrian_involved=len(detection.pedestrians) > 0,
-                    is_rollover=detection.incident_type == IncidentType.ROLLOVER,
-                    is_multi_vehicle=detection.incident_type == IncidentType.MULTI_VEHICLE,
-                    detection_confidence=detection.confidence
-                )
-                severity, _, _ = self.scorer.calculate_severity(factors)
+                severity = self._severity(detection)
                 
                 report = IncidentReport(
                     camera_id=camera_id,
-                    incident_type=detection.incident_type.value,
-                    severity=severity.value,
+                    incident_type=detection.incident_type,
+                    severity=severity,
                     confidence_score=detection.confidence,
                     vehicles_involved=len(detection.vehicles),
                     pedestrian_involved=len(detection.pedestrians) > 0,
@@ -309,16 +448,21 @@ if __name__ == "__main__":
     if args.demo or not args.video:
         run_demo()
     else:
+        # Compile the kernels before the first frame instead of on it
+        _warmup.warmup()
         pipeline = InferencePipeline()
-        incidents = pipeline.process_video(
-            video_path=args.video,
-            camera_id=args.camera_id,
-            output_dir=args.output_dir,
-            submit_to_api=not args.no_submit
-        )
+        try:
+            incidents = pipeline.process_video(
+                video_path=args.video,
+                camera_id=args.camera_id,
+                output_dir=args.output_dir,
+                submit_to_api=not args.no_submit
+            )
+        finally:
+            pipeline.close()
         
         print(f"\n{'='*40}")
         print(f"Processing complete!")
         print(f"Incidents detected: {len(incidents)}")
         for i, inc in enumerate(incidents):
-            print(f"  {i+1}. {inc.incident_type} - {inc.severity} ({inc.confidence_score:.2f})")
+            print(f"  {i+1}. {INCIDENT_TYPE_NAMES[inc.incident_type]} - {SEVERITY_NAMES[inc.severity]} ({inc.confidence_score:.2f})")
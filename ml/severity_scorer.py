@@ -2,22 +2,77 @@
 Severity Scoring Logic for Accident Incidents
 Calculates severity based on multiple factors
 """
-from enum import Enum
+from bisect import bisect_right
+from enum import IntEnum
+from operator import attrgetter
+from types import MappingProxyType
 from dataclasses import dataclass
-from typing import Optional
+from typing import Dict, Optional, List, Tuple
 import logging
 
+import numpy as np
+
+import _severity_kernel
+
 logger = logging.getLogger(__name__)
 
 
-class SeverityLevel(str, Enum):
-    LOW = "LOW"
-    MEDIUM = "MEDIUM"  
-    HIGH = "HIGH"
-    CRITICAL = "CRITICAL"
+class SeverityLevel(IntEnum):
+    LOW = 1
+    MEDIUM = 2
+    HIGH = 3
+    CRITICAL = 4
+
+
+# API names for SeverityLevel (the backend's severity strings)
+SEVERITY_NAMES = {level: level.name for level in SeverityLevel}
+
+
+# Indexed by _severity_kernel level codes
+_LEVELS = (SeverityLevel.LOW, SeverityLevel.MEDIUM, SeverityLevel.HIGH, SeverityLevel.CRITICAL)
+
+# Response recommendations per level; copied on return so callers can't alter them
+_RECS = {
+    SeverityLevel.LOW: {
+        "ambulance": "NOT REQUIRED",
+        "police": "Log only, no immediate report",
+        "notification": "Low priority notification",
+        "priority": "P3 - Review when available"
+    },
+    SeverityLevel.MEDIUM: {
+        "ambulance": "OPTIONAL - Based on verification",
+        "police": "Generate report after verification",
+        "notification": "Standard notification",
+        "priority": "P2 - Handle within 10 minutes"
+    },
+    SeverityLevel.HIGH: {
+        "ambulance": "RECOMMENDED - Prompt operator",
+        "police": "Generate report within 5 minutes",
+        "notification": "Visual alert",
+        "priority": "P1 - Handle within 2 minutes"
+    },
+    SeverityLevel.CRITICAL: {
+        "ambulance": "IMMEDIATE - Prompt operator for dispatch",
+        "police": "IMMEDIATE - Auto-generate report",
+        "notification": "Flash alert + audio alarm",
+        "priority": "P0 - Handle immediately"
+    },
+}
+
+# calculate_severity breakdown keys, in weight-vector order
+_BREAKDOWN_KEYS = (
+    "pedestrian_involved", "rollover", "multi_vehicle", "fire_smoke",
+    "extra_vehicles", "high_speed", "high_traffic"
+)
+
+# SeverityFactors fields read by to_soa, in _severity_kernel argument order
+_SOA_FIELDS = attrgetter(
+    "pedestrian_involved", "is_rollover", "is_multi_vehicle", "fire_smoke_detected",
+    "vehicle_count", "estimated_speed", "traffic_density", "detection_confidence"
+)
 
 
-@dataclass
+@dataclass(slots=True)
 class SeverityFactors:
     """Factors considered in severity scoring"""
     vehicle_count: int = 0
@@ -28,6 +83,29 @@ class SeverityFactors:
     estimated_speed: Optional[float] = None  # km/h
     detection_confidence: float = 0.0
     traffic_density: str = "normal"  # low, normal, high
+    
+    @classmethod
+    def to_soa(cls, batch: List["SeverityFactors"]) -> Dict[str, np.ndarray]:
+        """
+        Column arrays for _severity_kernel.score_batch, keyed by its argument
+        names. Booleans become 0/1 floats and unknown speed 0.
+        """
+        n = len(batch)
+        ped, roll, multi, fire, vcount, speed, traffic, conf = zip(*map(_SOA_FIELDS, batch)) if n else ((),) * 8
+        
+        def column(values, dtype=np.float64):
+            return np.fromiter(values, dtype=dtype, count=n)
+        
+        return {
+            "pedestrian": column(ped),
+            "rollover": column(roll),
+            "multi": column(multi),
+            "fire": column(fire),
+            "vcount": column(vcount, np.int64),
+            "speed": column(v or 0.0 for v in speed),
+            "traffic_high": column(t == "high" for t in traffic),
+            "conf": column(conf),
+        }
 
 
 class SeverityScorer:
@@ -57,9 +135,21 @@ class SeverityScorer:
     
     def __init__(self, custom_weights: Optional[dict] = None):
         """Initialize scorer with optional custom weights"""
-        self.weights = self.WEIGHTS.copy()
-        if custom_weights:
-            self.weights.update(custom_weights)
+        # Read-only: the weight vector below is built from these once, so
+        # changing them later would have no effect
+        self.weights = MappingProxyType({**self.WEIGHTS, **(custom_weights or {})})
+        
+        # Weight/threshold vectors in the order _severity_kernel expects
+        w = self.weights
+        self._weight_vec = np.array([
+            w["pedestrian"], w["rollover"], w["multi_vehicle"], w["fire_smoke"],
+            w["vehicle_count"], w["high_speed"], w["high_traffic"]
+        ], dtype=np.float64)
+        self._threshold_vec = np.array([
+            self.THRESHOLDS["CRITICAL"], self.THRESHOLDS["HIGH"], self.THRESHOLDS["MEDIUM"]
+        ], dtype=np.float64)
+        # Ascending MEDIUM/HIGH/CRITICAL cutoffs; bisect_right gives the _LEVELS index
+        self._threshold_list = self._threshold_vec[::-1].tolist()
     
     def calculate_severity(self, factors: SeverityFactors) -> tuple:
         """
@@ -71,69 +161,50 @@ class SeverityScorer:
         Returns:
             Tuple of (SeverityLevel, score, breakdown)
         """
-        score = 0.0
-        breakdown = {}
-        
-        # Pedestrian involvement (highest weight)
-        if factors.pedestrian_involved:
-            points = self.weights["pedestrian"]
-            score += points
-            breakdown["pedestrian_involved"] = points
-        
-        # Rollover detection
-        if factors.is_rollover:
-            points = self.weights["rollover"]
-            score += points
-            breakdown["rollover"] = points
+        # Factor vector in _weight_vec order: flags are 0/1, vehicles counts extras beyond 1
+        factor_vec = np.array([
+            factors.pedestrian_involved,
+            factors.is_rollover,
+            factors.is_multi_vehicle,
+            factors.fire_smoke_detected,
+            max(factors.vehicle_count - 1, 0),
+            (factors.estimated_speed or 0) > 60,
+            factors.traffic_density == "high"
+        ], dtype=np.float64)
+        points = factor_vec * self._weight_vec
         
-        # Multi-vehicle pile-up
-        if factors.is_multi_vehicle:
-            points = self.weights["multi_vehicle"]
-            score += points
-            breakdown["multi_vehicle"] = points
-        
-        # Fire/smoke detection
-        if factors.fire_smoke_detected:
-            points = self.weights["fire_smoke"]
-            score += points
-            breakdown["fire_smoke"] = points
-        
-        # Vehicle count (additional vehicles beyond 1)
-        if factors.vehicle_count > 1:
-            extra_vehicles = factors.vehicle_count - 1
-            points = extra_vehicles * self.weights["vehicle_count"]
-            score += points
-            breakdown["extra_vehicles"] = points
-        
-        # High-speed collision
-        if factors.estimated_speed and factors.estimated_speed > 60:
-            points = self.weights["high_speed"]
-            score += points
-            breakdown["high_speed"] = points
-        
-        # High traffic area
-        if factors.traffic_density == "high":
-            points = self.weights["high_traffic"]
-            score += points
-            breakdown["high_traffic"] = points
+        score = float(points.sum())
+        breakdown = {key: p for key, p, f in zip(_BREAKDOWN_KEYS, points.tolist(), factor_vec.tolist()) if f}
         
         # Apply confidence scaling
         score *= min(factors.detection_confidence, 1.0) + 0.5
         
         # Determine severity level
-        if score >= self.THRESHOLDS["CRITICAL"]:
-            level = SeverityLevel.CRITICAL
-        elif score >= self.THRESHOLDS["HIGH"]:
-            level = SeverityLevel.HIGH
-        elif score >= self.THRESHOLDS["MEDIUM"]:
-            level = SeverityLevel.MEDIUM
-        else:
-            level = SeverityLevel.LOW
+        level = _LEVELS[bisect_right(self._threshold_list, score)]
         
-        logger.info(f"Severity calculated: {level.value} (score: {score:.2f})")
+        logger.info(f"Severity calculated: {level.name} (score: {score:.2f})")
         
         return level, score, breakdown
     
+    def score_batch(self, factors: List[SeverityFactors]) -> List[Tuple[SeverityLevel, float]]:
+        """
+        Score many incidents in one pass (Numba kernel when available).
+        Same results as calculate_severity, without the per-factor breakdown.
+        
+        Returns:
+            List of (SeverityLevel, score), parallel to factors
+        """
+        if not factors:
+            return []
+        
+        levels, scores = _severity_kernel.score_batch(
+            **SeverityFactors.to_soa(factors),
+            w=self._weight_vec,
+            thr=self._threshold_vec
+        )
+        
+        return [(_LEVELS[level], score) for level, score in zip(levels.tolist(), scores.tolist())]
+    
     def quick_severity(
         self,
         vehicle_count: int,
@@ -168,52 +239,30 @@ class SeverityScorer:
         Get numeric priority score for sorting/ordering.
         Higher = more urgent.
         """
-        priority_map = {
-            SeverityLevel.CRITICAL: 4,
-            SeverityLevel.HIGH: 3,
-            SeverityLevel.MEDIUM: 2,
-            SeverityLevel.LOW: 1
-        }
-        return priority_map.get(severity, 0)
+        # Level values already run 1 (LOW) .. 4 (CRITICAL)
+        return int(severity)
     
     def should_auto_dispatch_ambulance(self, severity: SeverityLevel) -> bool:
         """
         Determine if severity warrants ambulance prompt.
         Note: Actual dispatch still requires human confirmation.
         """
-        return severity in [SeverityLevel.HIGH, SeverityLevel.CRITICAL]
+        return severity >= SeverityLevel.HIGH
     
     def get_response_recommendation(self, severity: SeverityLevel) -> dict:
         """
         Get recommended response actions based on severity.
         """
-        recommendations = {
-            SeverityLevel.CRITICAL: {
-                "ambulance": "IMMEDIATE - Prompt operator for dispatch",
-                "police": "IMMEDIATE - Auto-generate report",
-                "notification": "Flash alert + audio alarm",
-                "priority": "P0 - Handle immediately"
-            },
-            SeverityLevel.HIGH: {
-                "ambulance": "RECOMMENDED - Prompt operator",
-                "police": "Generate report within 5 minutes",
-                "notification": "Visual alert",
-                "priority": "P1 - Handle within 2 minutes"
-            },
-            SeverityLevel.MEDIUM: {
-                "ambulance": "OPTIONAL - Based on verification",
-                "police": "Generate report after verification",
-                "notification": "Standard notification",
-                "priority": "P2 - Handle within 10 minutes"
-            },
-            SeverityLevel.LOW: {
-                "ambulance": "NOT REQUIRED",
-                "police": "Log only, no immediate report",
-                "notification": "Low priority notification",
-                "priority": "P3 - Review when available"
-            }
-        }
-        return recommendations.get(severity, recommendations[SeverityLevel.LOW])
+        return dict(_RECS.get(severity, _RECS[SeverityLevel.LOW]))
+
+
+def warmup():
+    """Compile the batch scoring kernel so JIT cost doesn't land on the first batch"""
+    _severity_kernel.warmup()
+
+
+# Shared default-weights scorer for calculate_severity
+_DEFAULT_SCORER = SeverityScorer()
 
 
 # Convenience function for quick scoring
@@ -231,7 +280,7 @@ def calculate_severity(
     Returns:
         Tuple of (SeverityLevel, score, recommendation)
     """
-    scorer = SeverityScorer()
+    scorer = _DEFAULT_SCORER
     
     factors = SeverityFactors(
         vehicle_count=vehicle_count,
@@ -254,11 +303,11 @@ if __name__ == "__main__":
     
     # Test case 1: Minor collision
     level, score, rec = calculate_severity(vehicle_count=2, confidence=0.8)
-    print(f"Minor collision: {level.value} (score: {score:.2f})")
+    print(f"Minor collision: {level.name} (score: {score:.2f})")
     
     # Test case 2: Pedestrian involved
     level, score, rec = calculate_severity(vehicle_count=1, pedestrian_involved=True)
-    print(f"Pedestrian hit: {level.value} (score: {score:.2f})")
+    print(f"Pedestrian hit: {level.name} (score: {score:.2f})")
     
     # Test case 3: Multi-vehicle with rollover
     level, score, rec = calculate_severity(
@@ -266,8 +315,8 @@ if __name__ == "__main__":
         is_multi_vehicle=True,
         is_rollover=True
     )
-    print(f"Multi-vehicle rollover: {level.value} (score: {score:.2f})")
+    print(f"Multi-vehicle rollover: {level.name} (score: {score:.2f})")
     
     # Test case 4: Fire detected
     level, score, rec = calculate_severity(vehicle_count=2, fire_smoke=True)
-    print(f"Fire detected: {level.value} (score: {score:.2f})")
+    print(f"Fire detected: {level.name} (score: {score:.2f})")
@@ -0,0 +1,7 @@
+"""
+Test setup: ml modules import each other flat (from detector import ...)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,53 @@
+"""
+The Numba classification kernel and the NumPy/Python rules must agree
+"""
+import numpy as np
+import pytest
+
+import detector
+from detector import AccidentDetector, DetectionArray
+
+NAMES = ("person", "bicycle", "car")
+
+pytestmark = pytest.mark.skipif(not detector.NUMBA_AVAILABLE, reason="numba not installed")
+
+
+def _detector(vectorized_iou_min: int) -> AccidentDetector:
+    # The rules only read class constants, so skip __init__ and its model load
+    det = AccidentDetector.__new__(AccidentDetector)
+    det.VECTORIZED_IOU_MIN_VEHICLES = vectorized_iou_min
+    return det
+
+
+def _random_detections(rng, count: int, class_id: int) -> DetectionArray:
+    xy = rng.integers(0, 600, size=(count, 2))
+    wh = rng.integers(5, 200, size=(count, 2))
+    bbox = np.concatenate([xy, xy + wh], axis=1).astype(np.int32)
+    confidence = rng.uniform(0.3, 1.0, size=count).astype(np.float32)
+    return DetectionArray(bbox, confidence, np.full(count, class_id, dtype=np.int32), NAMES)
+
+
+def _frames(seed: int = 0, count: int = 500):
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        vehicles = _random_detections(rng, int(rng.integers(1, 8)), 2)
+        pedestrians = _random_detections(rng, int(rng.integers(0, 3)), 0)
+        yield vehicles, pedestrians
+
+
+# 2 forces the vectorized IoU path for every pair count, 100 the scalar one
+@pytest.mark.parametrize("vectorized_iou_min", [2, 100])
+def test_compiled_matches_rules(vectorized_iou_min):
+    det = _detector(vectorized_iou_min)
+    seen = set()
+    for vehicles, pedestrians in _frames():
+        expected = det._classify_rules(vehicles, pedestrians)
+        actual = det._classify_compiled(vehicles, pedestrians)
+        
+        assert actual[0] == expected[0]
+        assert actual[1] == pytest.approx(expected[1], rel=1e-5)
+        assert actual[2] == expected[2]
+        seen.add(expected[0])
+    
+    # The random frames should exercise more than the "no incident" path
+    assert len(seen) >= 3
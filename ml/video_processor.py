@@ -4,7 +4,13 @@ Handles video ingestion with configurable frame sampling
 """
 import cv2
 import os
-from typing import Generator, Tuple, Optional
+import queue
+import shutil
+import struct
+import subprocess
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Generator, List, Tuple, Optional
 from dataclasses import dataclass
 import logging
 from datetime import datetime
@@ -12,6 +18,104 @@ import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Memory/latency over throughput: keep one decoded frame buffered per capture
+CAPTURE_BUFFER_SIZE = 1
+
+
+def _open_capture(video_path: str, decode_threads: Optional[int] = None) -> cv2.VideoCapture:
+    """
+    FFmpeg-backed capture with hardware-accelerated decode (VAAPI/D3D11/...)
+    when OpenCV supports it, else the default software decoder. decode_threads
+    caps this capture's FFmpeg worker threads (OpenCV 4.6+; None = FFmpeg default).
+    """
+    params = []
+    n_threads = getattr(cv2, "CAP_PROP_N_THREADS", None)
+    if decode_threads is not None and n_threads is not None:
+        params += [n_threads, decode_threads]
+    
+    hw_accel = getattr(cv2, "CAP_PROP_HW_ACCELERATION", None)
+    cap = None
+    if hw_accel is not None:
+        cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [hw_accel, cv2.VIDEO_ACCELERATION_ANY] + params)
+        if not cap.isOpened():
+            cap.release()
+            cap = None
+    if cap is None:
+        cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, params)
+        if not cap.isOpened():
+            cap.release()
+            cap = cv2.VideoCapture(video_path)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, CAPTURE_BUFFER_SIZE)
+    return cap
+
+
+def _open_gpu_reader(video_path: str):
+    """NVDEC reader from cv2.cudacodec, or None when OpenCV has no CUDA device/support"""
+    cudacodec = getattr(cv2, "cudacodec", None)
+    if cudacodec is None:
+        return None
+    try:
+        if cv2.cuda.getCudaEnabledDeviceCount() == 0:
+            return None
+        return cudacodec.createVideoReader(video_path)
+    except (AttributeError, cv2.error) as e:
+        logger.warning("NVDEC unavailable, using CPU decode: %s", e)
+        return None
+
+
+def _log_io_error(future: Future):
+    if future.exception() is not None:
+        logger.error("Background write failed: %s", future.exception())
+
+
+def _write_snapshot(data: np.ndarray, output_path: str):
+    with open(output_path, "wb") as f:
+        f.write(data.data)
+    logger.info("Saved snapshot: %s", output_path)
+
+
+def _write_clip(frames: List[np.ndarray], output_path: str, fps: float, size: Tuple[int, int]):
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    out = cv2.VideoWriter(output_path, fourcc, fps, size)
+    for frame in frames:
+        out.write(frame)
+    out.release()
+    logger.info("Saved clip: %s (%.2fs)", output_path, len(frames) / fps)
+
+
+def _remux_clip(video_path: str, start_time: float, end_time: float, output_path: str) -> bool:
+    """
+    Cut [start_time, end_time) by stream copy: container packets are rewritten
+    without decoding, so the cut snaps to the keyframe before start_time.
+    Returns False when ffmpeg is missing or fails.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return False
+    # -ss before -i seeks on the input; timestamps then restart at 0, so the
+    # end is given as a duration
+    cmd = [
+        ffmpeg, "-y", "-loglevel", "error",
+        "-ss", f"{start_time:.3f}", "-i", video_path,
+        "-t", f"{end_time - start_time:.3f}",
+        "-c", "copy", "-avoid_negative_ts", "make_zero",
+        output_path
+    ]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True)
+    except subprocess.CalledProcessError as e:
+        logger.warning("ffmpeg remux failed, re-encoding clip: %s", e.stderr.decode(errors="replace").strip())
+        return False
+    return True
+
+
+# extract_frames output colour -> (CPU conversion from BGR, NVDEC conversion from BGRA)
+_COLOR_CODES = {
+    "bgr": (None, cv2.COLOR_BGRA2BGR),
+    "rgb": (cv2.COLOR_BGR2RGB, cv2.COLOR_BGRA2RGB),
+    "gray": (cv2.COLOR_BGR2GRAY, cv2.COLOR_BGRA2GRAY),
+}
+
 
 @dataclass
 class VideoInfo:
@@ -25,13 +129,55 @@ class VideoInfo:
     codec: str
 
 
-@dataclass
+class _CudaArray:
+    """__cuda_array_interface__ view of an 8-bit GpuMat, for zero-copy import"""
+    __slots__ = ("__cuda_array_interface__", "owner")
+    
+    def __init__(self, gpu_mat):
+        cols, rows = gpu_mat.size()
+        channels = gpu_mat.channels()
+        self.owner = gpu_mat  # keeps the device memory alive
+        self.__cuda_array_interface__ = {
+            "shape": (rows, cols, channels),
+            "strides": (gpu_mat.step, channels, 1),
+            "typestr": "|u1",
+            "data": (gpu_mat.cudaPtr(), False),
+            "version": 3,
+        }
+
+
+@dataclass(slots=True)
 class FrameData:
-    """Processed frame with metadata"""
-    frame: np.ndarray
+    """
+    Processed frame with metadata. Frames decoded with keep_on_gpu have
+    device == 'cuda', frame None and the image in gpu_frame (cv2.cuda_GpuMat);
+    cpu() downloads it on first use.
+    """
+    frame: Optional[np.ndarray]
     frame_id: int
     timestamp: float  # seconds from start
     original_fps: float
+    gpu_frame: Optional["cv2.cuda_GpuMat"] = None
+    device: str = "cpu"
+    
+    def cpu(self) -> np.ndarray:
+        """Host copy of the frame (downloaded once for GPU-resident frames)"""
+        if self.frame is None:
+            self.frame = self.gpu_frame.download()
+        return self.frame
+    
+    def as_torch(self):
+        """
+        HWC uint8 BGR torch.Tensor sharing memory with the frame: the GpuMat
+        for GPU-resident frames (via DLPack when supported, else
+        __cuda_array_interface__), the host array otherwise.
+        """
+        import torch
+        if self.device != "cuda":
+            return torch.from_numpy(self.cpu())
+        if hasattr(self.gpu_frame, "__dlpack__"):
+            return torch.utils.dlpack.from_dlpack(self.gpu_frame)
+        return torch.as_tensor(_CudaArray(self.gpu_frame), device="cuda")
 
 
 class VideoProcessor:
@@ -42,16 +188,44 @@ class VideoProcessor:
     
     SUPPORTED_FORMATS = ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv']
     
-    def __init__(self, sample_fps: int = 5):
+    def __init__(
+        self,
+        sample_fps: int = 5,
+        target_size: Optional[Tuple[int, int]] = None,
+        color: str = "bgr",
+        decode_threads: Optional[int] = 1
+    ):
         """
         Initialize processor.
         
         Args:
             sample_fps: Target frames per second to extract (default: 5)
+            target_size: (width, height) to resize extracted frames to while
+                decoding (None = source resolution)
+            color: Channel layout of extracted frames: 'bgr', 'rgb' or 'gray'
+            decode_threads: FFmpeg decoder threads per capture; the default of 1
+                trades decode throughput for memory and leaves cores to inference
+                (None = FFmpeg default)
         """
+        if color not in _COLOR_CODES:
+            raise ValueError(f"Unsupported color: {color}")
         self.sample_fps = sample_fps
+        self.target_size = target_size
+        self.color = color
+        self.decode_threads = decode_threads
         self.current_video: Optional[cv2.VideoCapture] = None
         self.video_info: Optional[VideoInfo] = None
+        
+        # GPU (NVDEC) reader used by extract_frames when available; current_video
+        # still serves metadata, seeking and clip extraction
+        self._gpu_reader = None
+        
+        # Background decoder used by extract_frames_async
+        self._decoder_thread: Optional[threading.Thread] = None
+        self._decoder_stop = threading.Event()
+        
+        # Snapshot/clip encoding and writes, off the inference thread
+        self._io_pool: Optional[ThreadPoolExecutor] = None
     
     def load_video(self, video_path: str) -> VideoInfo:
         """
@@ -76,7 +250,7 @@ class VideoProcessor:
             raise ValueError(f"Unsupported format: {ext}. Supported: {self.SUPPORTED_FORMATS}")
         
         # Open video
-        cap = cv2.VideoCapture(video_path)
+        cap = _open_capture(video_path, self.decode_threads)
         if not cap.isOpened():
             raise ValueError(f"Failed to open video: {video_path}")
         
@@ -89,9 +263,10 @@ class VideoProcessor:
         
         # Get codec
         fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
-        codec = "".join([chr((fourcc >> 8 * i) & 0xFF) for i in range(4)])
+        codec = struct.pack("<I", fourcc & 0xFFFFFFFF).decode("latin-1")
         
         self.current_video = cap
+        self._gpu_reader = _open_gpu_reader(video_path)
         self.video_info = VideoInfo(
             path=video_path,
             width=width,
@@ -102,17 +277,29 @@ class VideoProcessor:
             codec=codec
         )
         
-        logger.info(f"Loaded video: {video_path}")
-        logger.info(f"Resolution: {width}x{height}, FPS: {fps:.2f}, Duration: {duration:.2f}s")
+        logger.info("Loaded video: %s", video_path)
+        logger.info("Resolution: %dx%d, FPS: %.2f, Duration: %.2fs", width, height, fps, duration)
+        if self._gpu_reader is not None:
+            logger.info("Decoding on GPU (NVDEC)")
         
         return self.video_info
     
-    def extract_frames(self, max_frames: Optional[int] = None) -> Generator[FrameData, None, None]:
+    def extract_frames(
+        self,
+        max_frames: Optional[int] = None,
+        pool_size: int = 0,
+        keep_on_gpu: bool = False
+    ) -> Generator[FrameData, None, None]:
         """
         Extract frames at the configured sample rate.
         
         Args:
             max_frames: Maximum number of frames to extract (None = all)
+            pool_size: Decode into a ring of this many preallocated buffers instead of
+                a new array per frame (0 = no pool). A yielded frame is overwritten
+                pool_size frames later, so consumers holding more than that must copy.
+            keep_on_gpu: With NVDEC decoding, yield frames as device-resident
+                GpuMats (frame=None) for GPU consumers instead of downloading them
             
         Yields:
             FrameData for each sampled frame
@@ -124,35 +311,165 @@ class VideoProcessor:
         original_fps = self.video_info.fps
         frame_skip = max(1, int(original_fps / self.sample_fps))
         
-        logger.info(f"Extracting frames at {self.sample_fps} FPS (every {frame_skip} frames)")
+        logger.info("Extracting frames at %d FPS (every %d frames)", self.sample_fps, frame_skip)
         
+        inv_fps = 1.0 / original_fps
+        countdown = 0  # frames until the next sampled one
         frame_count = 0
         extracted_count = 0
+        gpu_reader = self._gpu_reader
+        keep_on_gpu = keep_on_gpu and gpu_reader is not None
+        
+        target_size = self.target_size
+        cpu_color, gpu_color = _COLOR_CODES[self.color]
+        convert = target_size is not None or cpu_color is not None
+        
+        width, height = target_size or (self.video_info.width, self.video_info.height)
+        shape = (height, width) if self.color == "gray" else (height, width, 3)
+        pool = [np.empty(shape, dtype=np.uint8) for _ in range(pool_size)]
+        buf = None
+        
+        cap = self.current_video
         
         while True:
-            ret, frame = self.current_video.read()
+            sampled = countdown == 0
+            if sampled and pool:
+                buf = pool[extracted_count % pool_size]
+            if gpu_reader is not None:
+                ret, gpu_frame = gpu_reader.nextFrame()
+            else:
+                # grab() only advances the stream; the colour conversion and copy
+                # out in retrieve() are paid for sampled frames only
+                ret = cap.grab()
+                if ret and sampled:
+                    # With a pool, OpenCV decodes in place when buf matches the frame size
+                    ret, frame = cap.retrieve(None if convert else buf)
+                    if ret and convert:
+                        frame = self._convert_frame(frame, target_size, cpu_color, buf)
             if not ret:
                 break
             
             # Sample frames at target rate
-            if frame_count % frame_skip == 0:
-                timestamp = frame_count / original_fps
+            if sampled:
+                gpu_out = None
+                if gpu_reader is not None:
+                    # NVDEC output is BGRA; only sampled frames are resized/converted,
+                    # and resizing first leaves fewer pixels to convert and download
+                    if target_size is not None:
+                        gpu_frame = cv2.cuda.resize(gpu_frame, target_size, interpolation=cv2.INTER_AREA)
+                    gpu_out = cv2.cuda.cvtColor(gpu_frame, gpu_color)
+                    frame = None if keep_on_gpu else gpu_out.download(buf)
+                
+                timestamp = frame_count * inv_fps
                 
                 yield FrameData(
                     frame=frame,
                     frame_id=frame_count,
                     timestamp=timestamp,
-                    original_fps=original_fps
+                    original_fps=original_fps,
+                    gpu_frame=gpu_out if keep_on_gpu else None,
+                    device="cuda" if keep_on_gpu else "cpu"
                 )
                 
                 extracted_count += 1
                 
                 if max_frames and extracted_count >= max_frames:
                     break
+                
+                countdown = frame_skip - 1
+            else:
+                countdown -= 1
             
             frame_count += 1
         
-        logger.info(f"Extracted {extracted_count} frames from {frame_count} total")
+        logger.info("Extracted %d frames from %d total", extracted_count, frame_count)
+    
+    @staticmethod
+    def _convert_frame(
+        frame: np.ndarray,
+        target_size: Optional[Tuple[int, int]],
+        color_code: Optional[int],
+        out: Optional[np.ndarray]
+    ) -> np.ndarray:
+        """Resize and/or colour-convert a decoded BGR frame, writing the result into out"""
+        if target_size is not None:
+            # INTER_AREA averages source pixels, avoiding aliasing when downscaling
+            frame = cv2.resize(
+                frame, target_size, dst=out if color_code is None else None, interpolation=cv2.INTER_AREA
+            )
+        if color_code is not None:
+            frame = cv2.cvtColor(frame, color_code, dst=out)
+        return frame
+    
+    def extract_frames_async(
+        self,
+        max_frames: Optional[int] = None,
+        queue_size: int = 8,
+        pool_size: int = 0,
+        keep_on_gpu: bool = False
+    ) -> Generator[FrameData, None, None]:
+        """
+        Like extract_frames, but decoding runs on a background thread that
+        stays up to queue_size frames ahead of the consumer. OpenCV releases
+        the GIL while decoding, so this overlaps with downstream work.
+        Decoder errors are re-raised in the consumer.
+        
+        Args:
+            max_frames: Maximum number of frames to extract (None = all)
+            queue_size: Decoded frames buffered ahead
+            pool_size: See extract_frames; must exceed every frame the consumer
+                holds plus queue_size + 1
+            keep_on_gpu: See extract_frames
+            
+        Yields:
+            FrameData for each sampled frame
+        """
+        if self.current_video is None or self.video_info is None:
+            raise RuntimeError("No video loaded. Call load_video() first.")
+        
+        frames: queue.Queue = queue.Queue(maxsize=queue_size)
+        stop = self._decoder_stop
+        stop.clear()
+        done = object()
+        
+        def put(item) -> bool:
+            # Give up once the consumer has stopped, instead of blocking on a full queue
+            while not stop.is_set():
+                try:
+                    frames.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def decode():
+            try:
+                for frame_data in self.extract_frames(max_frames, pool_size, keep_on_gpu):
+                    if not put(frame_data):
+                        return
+                put(done)
+            except Exception as e:
+                put(e)
+        
+        self._decoder_thread = threading.Thread(target=decode, name="video-decoder", daemon=True)
+        self._decoder_thread.start()
+        try:
+            while True:
+                item = frames.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self._stop_decoder()
+    
+    def _stop_decoder(self):
+        """Stop and join the extract_frames_async thread, if running"""
+        if self._decoder_thread is not None:
+            self._decoder_stop.set()
+            self._decoder_thread.join()
+            self._decoder_thread = None
     
     def extract_snapshot(self, timestamp_seconds: float) -> Optional[np.ndarray]:
         """
@@ -178,9 +495,18 @@ class VideoProcessor:
             return frame
         return None
     
+    def _submit_io(self, fn, *args) -> Future:
+        if self._io_pool is None:
+            self._io_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="video-io")
+        future = self._io_pool.submit(fn, *args)
+        future.add_done_callback(_log_io_error)
+        return future
+    
     def save_snapshot(self, frame: np.ndarray, output_path: str) -> str:
         """
-        Save a frame as an image file.
+        Save a frame as an image file. The frame is encoded before returning
+        (so callers may reuse its buffer); the file is written in the background
+        and is complete once close() returns.
         
         Args:
             frame: Frame to save
@@ -190,23 +516,34 @@ class VideoProcessor:
             Saved file path
         """
         os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
-        cv2.imwrite(output_path, frame)
-        logger.info(f"Saved snapshot: {output_path}")
+        ext = os.path.splitext(output_path)[1] or '.jpg'
+        params = [cv2.IMWRITE_JPEG_QUALITY, 90] if ext.lower() in ('.jpg', '.jpeg') else []
+        ok, data = cv2.imencode(ext, frame, params)
+        if not ok:
+            raise ValueError(f"Could not encode snapshot as {ext}")
+        self._submit_io(_write_snapshot, data, output_path)
         return output_path
     
     def extract_clip(
         self, 
         start_time: float, 
         end_time: float, 
-        output_path: str
+        output_path: str,
+        exact: bool = False
     ) -> str:
         """
         Extract a video clip between two timestamps.
         
+        By default the clip is remuxed with ffmpeg (stream copy, lossless, no
+        decode) and starts at the keyframe at or before start_time. With
+        exact=True, or when ffmpeg is unavailable, frames are decoded here and
+        re-encoded in the background; that clip is complete once close() returns.
+        
         Args:
             start_time: Start time in seconds
             end_time: End time in seconds
             output_path: Output video file path
+            exact: Cut on the exact frames instead of keyframes
             
         Returns:
             Output file path
@@ -216,14 +553,9 @@ class VideoProcessor:
         
         os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
         
-        # Setup writer
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(
-            output_path,
-            fourcc,
-            self.video_info.fps,
-            (self.video_info.width, self.video_info.height)
-        )
+        if not exact and _remux_clip(self.video_info.path, start_time, end_time, output_path):
+            logger.info("Saved clip: %s (%.2fs, remuxed)", output_path, end_time - start_time)
+            return output_path
         
         # Calculate frame range
         start_frame = int(start_time * self.video_info.fps)
@@ -232,25 +564,36 @@ class VideoProcessor:
         # Seek to start
         self.current_video.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
         
+        frames = []
         current_frame = start_frame
         while current_frame < end_frame:
             ret, frame = self.current_video.read()
             if not ret:
                 break
-            out.write(frame)
+            frames.append(frame)
             current_frame += 1
         
-        out.release()
-        logger.info(f"Saved clip: {output_path} ({end_time - start_time:.2f}s)")
+        self._submit_io(
+            _write_clip, frames, output_path,
+            self.video_info.fps, (self.video_info.width, self.video_info.height)
+        )
         
         return output_path
     
     def close(self):
         """Release video resources"""
+        # The decoder thread must be done with the capture before it is released
+        self._stop_decoder()
         if self.current_video:
             self.current_video.release()
             self.current_video = None
             self.video_info = None
+        self._gpu_reader = None
+        
+        # Let pending snapshot/clip writes finish
+        if self._io_pool is not None:
+            self._io_pool.shutdown(wait=True)
+            self._io_pool = None
     
     def __enter__(self):
         return self